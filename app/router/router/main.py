@@ -1,5 +1,7 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+import asyncio
 import logging
 import httpx
 
@@ -31,11 +33,40 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress larger responses (the all-patient JSON summaries in particular)
+# for clients that send Accept-Encoding: gzip
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 app.include_router(modeling.router)
 app.include_router(synthea.router)
 app.include_router(stat_server_py.router)
 
-@app.get("/health")
+@app.api_route("/healthz", methods=["GET", "HEAD"])
+async def liveness_check():
+    """Lightweight router liveness probe (does not contact backend services)"""
+    return {"status": "ok", "service": "router"}
+
+@app.get("/healthz/all")
+async def aggregate_health_check():
+    """Up/down status of the router and each backend service in one call (backends probed concurrently)"""
+    backend_services = {
+        "modeling": f"{settings.model_server_url}/health",
+        "stats": f"{settings.stat_server_py_url}/health",
+        "synthea": f"{settings.synthea_server_url}/health",
+    }
+
+    async def probe(client: httpx.AsyncClient, url: str) -> bool:
+        try:
+            response = await client.get(url)
+            return response.status_code == 200
+        except httpx.HTTPError:
+            return False
+
+    async with httpx.AsyncClient(timeout=2.0) as client:
+        results = await asyncio.gather(*(probe(client, url) for url in backend_services.values()))
+    return {"router": True, **dict(zip(backend_services, results))}
+
+@app.api_route("/health", methods=["GET", "HEAD"])
 async def health_check():
     """Router service health check"""
     try:
@@ -90,7 +121,7 @@ async def health_check():
         }
 
 
-@app.get("/modeling/health")
+@app.api_route("/modeling/health", methods=["GET", "HEAD"])
 async def modeling_health_proxy():
     """Proxy to model server health endpoint"""
     try:
@@ -103,7 +134,7 @@ async def modeling_health_proxy():
     except Exception as e:
         raise HTTPException(status_code=503, detail=f"Model server unreachable: {str(e)}")
 
-@app.get("/stats/health")
+@app.api_route("/stats/health", methods=["GET", "HEAD"])
 async def stats_health_proxy():
     """Proxy to stats server (Python) health endpoint"""
     try:
@@ -116,7 +147,7 @@ async def stats_health_proxy():
     except Exception as e:
         raise HTTPException(status_code=503, detail=f"Stats server unreachable: {str(e)}")
 
-@app.get("/stats-r/health")
+@app.api_route("/stats-r/health", methods=["GET", "HEAD"])
 async def stats_r_health_proxy():
     """Proxy to stats server (R) health endpoint"""
     try:
@@ -129,7 +160,7 @@ async def stats_r_health_proxy():
     except Exception as e:
         raise HTTPException(status_code=503, detail=f"Stats R server unreachable: {str(e)}")
 
-@app.get("/synthetic/health")
+@app.api_route("/synthetic/health", methods=["GET", "HEAD"])
 async def synthetic_health_proxy():
     """Proxy to synthea server health endpoint"""
     try:
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, HTTPException, Body, Path
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel, Field
 from typing import List, Any, Optional
 import httpx
@@ -39,7 +39,8 @@ async def list_models():
         async with httpx.AsyncClient(timeout=15.0) as client:
             resp = await client.get(url)
             resp.raise_for_status()
-            return resp.json()
+            # Relay the backend's JSON bytes as-is (no decode/re-encode); GZipMiddleware compresses them
+            return Response(content=resp.content, media_type="application/json")
     except httpx.HTTPStatusError as e:
         logger.error(f"Model server error: {e.response.text}")
         detail = e.response.text or "Error listing models"
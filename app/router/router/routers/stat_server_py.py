@@ -1,5 +1,6 @@
 from fastapi import APIRouter, HTTPException, Query, Path, Request, Response
 from fastapi.responses import JSONResponse
+import hashlib
 import httpx
 import logging
 from typing import List, Optional
@@ -16,6 +17,19 @@ router = APIRouter(
 BACKEND_URL = settings.stat_server_py_url.rstrip("/")
 HAPI_URL = settings.hapi_server_url.rstrip("/")
 
+
+def _image_response(request: Request, content: bytes, media_type: str = "image/png") -> Response:
+    """
+    Return an image response tagged with a content hash ETag.
+    Answers 304 Not Modified when the client already holds the same image.
+    """
+    etag = f'"{hashlib.sha256(content).hexdigest()[:32]}"'
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=content, media_type=media_type, headers={"ETag": etag})
+
+
 @router.get("/patients", response_class=JSONResponse)
 async def proxy_get_patients(
     request: Request,
@@ -206,6 +220,7 @@ async def proxy_list_all_patient_observations():
 
 @router.get("/visualize-observations", response_class=Response)
 async def proxy_visualize_observations(
+    request: Request,
     limit: int = Query(20, description="Limit the number of observation types to show"),
     cohort_id: str = Query(None, description="Optional cohort ID to filter resources by cohort tag")
 ):
@@ -226,7 +241,7 @@ async def proxy_visualize_observations(
         async with httpx.AsyncClient(timeout=60.0) as client:  # Longer timeout for image generation
             resp = await client.get(url, params=params)
             resp.raise_for_status()
-            return Response(content=resp.content, media_type="image/png")
+            return _image_response(request, resp.content)
     except httpx.HTTPStatusError as e:
         logger.error(f"Backend error: {e.response.text}")
         detail = e.response.text or "Error generating observation visualization"
@@ -238,6 +253,7 @@ async def proxy_visualize_observations(
 
 @router.get("/visualize-observations-by-gender", response_class=Response)
 async def proxy_visualize_observations_by_gender(
+    request: Request,
     limit: int = Query(10, description="Limit the number of observation types to show per gender"),
     cohort_id: str = Query(None, description="Optional cohort ID to filter resources by cohort tag")
 ):
@@ -258,7 +274,7 @@ async def proxy_visualize_observations_by_gender(
         async with httpx.AsyncClient(timeout=60.0) as client:  # Longer timeout for image generation
             resp = await client.get(url, params=params)
             resp.raise_for_status()
-            return Response(content=resp.content, media_type="image/png")
+            return _image_response(request, resp.content)
     except httpx.HTTPStatusError as e:
         logger.error(f"Backend error: {e.response.text}")
         detail = e.response.text or "Error generating observation visualization by gender"
@@ -270,6 +286,7 @@ async def proxy_visualize_observations_by_gender(
 
 @router.get("/visualize-observations-by-age", response_class=Response)
 async def proxy_visualize_observations_by_age(
+    request: Request,
     limit: int = Query(10, description="Limit the number of observation types to show per age bracket"),
     bracket_size: int = Query(5, description="Size of each age bracket in years"),
     cohort_id: str = Query(None, description="Optional cohort ID to filter resources by cohort tag")
@@ -292,7 +309,7 @@ async def proxy_visualize_observations_by_age(
         async with httpx.AsyncClient(timeout=60.0) as client:  # Longer timeout for image generation
             resp = await client.get(url, params=params)
             resp.raise_for_status()
-            return Response(content=resp.content, media_type="image/png")
+            return _image_response(request, resp.content)
     except httpx.HTTPStatusError as e:
         logger.error(f"Backend error: {e.response.text}")
         detail = e.response.text or "Error generating observation visualization by age"
@@ -304,6 +321,7 @@ async def proxy_visualize_observations_by_age(
 
 @router.get("/visualize-conditions", response_class=Response)
 async def proxy_visualize_conditions(
+    request: Request,
     limit: int = Query(20, description="Limit the number of condition types to show"),
     cohort_id: str = Query(None, description="Optional cohort ID to filter resources by cohort tag")
 ):
@@ -324,7 +342,7 @@ async def proxy_visualize_conditions(
         async with httpx.AsyncClient(timeout=60.0) as client:  # Longer timeout for image generation
             resp = await client.get(url, params=params)
             resp.raise_for_status()
-            return Response(content=resp.content, media_type="image/png")
+            return _image_response(request, resp.content)
     except httpx.HTTPStatusError as e:
         logger.error(f"Backend error: {e.response.text}")
         detail = e.response.text or "Error generating condition visualization"
@@ -336,6 +354,7 @@ async def proxy_visualize_conditions(
 
 @router.get("/visualize-conditions-by-gender", response_class=Response)
 async def proxy_visualize_conditions_by_gender(
+    request: Request,
     limit: int = Query(10, description="Limit the number of condition types to show per gender"),
     cohort_id: str = Query(None, description="Optional cohort ID to filter resources by cohort tag")
 ):
@@ -356,7 +375,7 @@ async def proxy_visualize_conditions_by_gender(
         async with httpx.AsyncClient(timeout=60.0) as client:  # Longer timeout for image generation
             resp = await client.get(url, params=params)
             resp.raise_for_status()
-            return Response(content=resp.content, media_type="image/png")
+            return _image_response(request, resp.content)
     except httpx.HTTPStatusError as e:
         logger.error(f"Backend error: {e.response.text}")
         detail = e.response.text or "Error generating condition visualization by gender"
@@ -368,6 +387,7 @@ async def proxy_visualize_conditions_by_gender(
 
 @router.get("/visualize-conditions-by-age", response_class=Response)
 async def proxy_visualize_conditions_by_age(
+    request: Request,
     limit: int = Query(10, description="Limit the number of condition types to show per age bracket"),
     bracket_size: int = Query(5, description="Size of each age bracket in years"),
     cohort_id: str = Query(None, description="Optional cohort ID to filter resources by cohort tag")
@@ -390,7 +410,7 @@ async def proxy_visualize_conditions_by_age(
         async with httpx.AsyncClient(timeout=60.0) as client:  # Longer timeout for image generation
             resp = await client.get(url, params=params)
             resp.raise_for_status()
-            return Response(content=resp.content, media_type="image/png")
+            return _image_response(request, resp.content)
     except httpx.HTTPStatusError as e:
         logger.error(f"Backend error: {e.response.text}")
         detail = e.response.text or "Error generating condition visualization by age"
@@ -402,6 +422,7 @@ async def proxy_visualize_conditions_by_age(
 
 @router.get("/visualize-procedures", response_class=Response)
 async def proxy_visualize_procedures(
+    request: Request,
     limit: int = Query(20, description="Limit the number of procedure types to show"),
     cohort_id: str = Query(None, description="Optional cohort ID to filter resources by cohort tag")
 ):
@@ -422,7 +443,7 @@ async def proxy_visualize_procedures(
         async with httpx.AsyncClient(timeout=60.0) as client:  # Longer timeout for image generation
             resp = await client.get(url, params=params)
             resp.raise_for_status()
-            return Response(content=resp.content, media_type="image/png")
+            return _image_response(request, resp.content)
     except httpx.HTTPStatusError as e:
         logger.error(f"Backend error: {e.response.text}")
         detail = e.response.text or "Error generating procedure visualization"
@@ -434,6 +455,7 @@ async def proxy_visualize_procedures(
 
 @router.get("/visualize-procedures-by-gender", response_class=Response)
 async def proxy_visualize_procedures_by_gender(
+    request: Request,
     limit: int = Query(10, description="Limit the number of procedure types to show per gender"),
     cohort_id: str = Query(None, description="Optional cohort ID to filter resources by cohort tag")
 ):
@@ -454,7 +476,7 @@ async def proxy_visualize_procedures_by_gender(
         async with httpx.AsyncClient(timeout=60.0) as client:  # Longer timeout for image generation
             resp = await client.get(url, params=params)
             resp.raise_for_status()
-            return Response(content=resp.content, media_type="image/png")
+            return _image_response(request, resp.content)
     except httpx.HTTPStatusError as e:
         logger.error(f"Backend error: {e.response.text}")
         detail = e.response.text or "Error generating procedure visualization by gender"
@@ -466,6 +488,7 @@ async def proxy_visualize_procedures_by_gender(
 
 @router.get("/visualize-procedures-by-age", response_class=Response)
 async def proxy_visualize_procedures_by_age(
+    request: Request,
     limit: int = Query(10, description="Limit the number of procedure types to show per age bracket"),
     bracket_size: int = Query(5, description="Size of each age bracket in years"),
     cohort_id: str = Query(None, description="Optional cohort ID to filter resources by cohort tag")
@@ -488,7 +511,7 @@ async def proxy_visualize_procedures_by_age(
         async with httpx.AsyncClient(timeout=60.0) as client:  # Longer timeout for image generation
             resp = await client.get(url, params=params)
             resp.raise_for_status()
-            return Response(content=resp.content, media_type="image/png")
+            return _image_response(request, resp.content)
     except httpx.HTTPStatusError as e:
         logger.error(f"Backend error: {e.response.text}")
         detail = e.response.text or "Error generating procedure visualization by age"
@@ -499,6 +522,7 @@ async def proxy_visualize_procedures_by_age(
 
 @router.get("/visualize-medications", response_class=Response)
 async def proxy_visualize_medications(
+    request: Request,
     limit: int = Query(10, description="Limit the number of medications to show"),
     cohort_id: str = Query(None, description="Optional cohort ID to filter resources by cohort tag")
 ):
@@ -519,7 +543,7 @@ async def proxy_visualize_medications(
         async with httpx.AsyncClient(timeout=60.0) as client:  # Longer timeout for image generation
             resp = await client.get(url, params=params)
             resp.raise_for_status()
-            return Response(content=resp.content, media_type=resp.headers.get('content-type', 'image/png'))
+            return _image_response(request, resp.content, resp.headers.get('content-type', 'image/png'))
     except httpx.HTTPStatusError as e:
         logger.error(f"Backend error: {e.response.text}")
         detail = e.response.text or "Error generating medication visualization"
@@ -531,6 +555,7 @@ async def proxy_visualize_medications(
 
 @router.get("/visualize-medications-by-gender", response_class=Response)
 async def proxy_visualize_medications_by_gender(
+    request: Request,
     limit: int = Query(10, description="Limit the number of medications to show per gender"),
     cohort_id: str = Query(None, description="Optional cohort ID to filter resources by cohort tag")
 ):
@@ -551,7 +576,7 @@ async def proxy_visualize_medications_by_gender(
         async with httpx.AsyncClient(timeout=60.0) as client:  # Longer timeout for image generation
             resp = await client.get(url, params=params)
             resp.raise_for_status()
-            return Response(content=resp.content, media_type=resp.headers.get('content-type', 'image/png'))
+            return _image_response(request, resp.content, resp.headers.get('content-type', 'image/png'))
     except httpx.HTTPStatusError as e:
         logger.error(f"Backend error: {e.response.text}")
         detail = e.response.text or "Error generating medication visualization by gender"
@@ -563,6 +588,7 @@ async def proxy_visualize_medications_by_gender(
 
 @router.get("/visualize-medications-by-age", response_class=Response)
 async def proxy_visualize_medications_by_age(
+    request: Request,
     limit: int = Query(10, description="Limit the number of medications to show per age bracket"),
     bracket_size: int = Query(5, description="Size of each age bracket in years"),
     cohort_id: str = Query(None, description="Optional cohort ID to filter resources by cohort tag")
@@ -585,7 +611,7 @@ async def proxy_visualize_medications_by_age(
         async with httpx.AsyncClient(timeout=60.0) as client:  # Longer timeout for image generation
             resp = await client.get(url, params=params)
             resp.raise_for_status()
-            return Response(content=resp.content, media_type=resp.headers.get('content-type', 'image/png'))
+            return _image_response(request, resp.content, resp.headers.get('content-type', 'image/png'))
     except httpx.HTTPStatusError as e:
         logger.error(f"Backend error: {e.response.text}")
         detail = e.response.text or "Error generating medication visualization by age"
@@ -597,6 +623,7 @@ async def proxy_visualize_medications_by_age(
 
 @router.get("/visualize-diagnostics", response_class=Response)
 async def proxy_visualize_diagnostics(
+    request: Request,
     limit: int = Query(10, description="Limit the number of diagnostic reports to show"),
     cohort_id: str = Query(None, description="Optional cohort ID to filter resources by cohort tag")
 ):
@@ -617,7 +644,7 @@ async def proxy_visualize_diagnostics(
         async with httpx.AsyncClient(timeout=60.0) as client:  # Longer timeout for image generation
             resp = await client.get(url, params=params)
             resp.raise_for_status()
-            return Response(content=resp.content, media_type=resp.headers.get('content-type', 'image/png'))
+            return _image_response(request, resp.content, resp.headers.get('content-type', 'image/png'))
     except httpx.HTTPStatusError as e:
         logger.error(f"Backend error: {e.response.text}")
         detail = e.response.text or "Error generating diagnostic visualization"
@@ -629,6 +656,7 @@ async def proxy_visualize_diagnostics(
 
 @router.get("/visualize-diagnostics-by-gender", response_class=Response)
 async def proxy_visualize_diagnostics_by_gender(
+    request: Request,
     limit: int = Query(10, description="Limit the number of diagnostic report types to show per gender"),
     cohort_id: str = Query(None, description="Optional cohort ID to filter resources by cohort tag")
 ):
@@ -649,7 +677,7 @@ async def proxy_visualize_diagnostics_by_gender(
         async with httpx.AsyncClient(timeout=60.0) as client:  # Longer timeout for image generation
             resp = await client.get(url, params=params)
             resp.raise_for_status()
-            return Response(content=resp.content, media_type=resp.headers.get('content-type', 'image/png'))
+            return _image_response(request, resp.content, resp.headers.get('content-type', 'image/png'))
     except httpx.HTTPStatusError as e:
         logger.error(f"Backend error: {e.response.text}")
         detail = e.response.text or "Error generating diagnostic visualization by gender"
@@ -661,6 +689,7 @@ async def proxy_visualize_diagnostics_by_gender(
 
 @router.get("/visualize-diagnostics-by-age", response_class=Response)
 async def proxy_visualize_diagnostics_by_age(
+    request: Request,
     limit: int = Query(10, description="Limit the number of diagnostic report types to show per age bracket"),
     bracket_size: int = Query(5, description="Size of each age bracket in years"),
     cohort_id: str = Query(None, description="Optional cohort ID to filter resources by cohort tag")
@@ -683,7 +712,7 @@ async def proxy_visualize_diagnostics_by_age(
         async with httpx.AsyncClient(timeout=60.0) as client:  # Longer timeout for image generation
             resp = await client.get(url, params=params)
             resp.raise_for_status()
-            return Response(content=resp.content, media_type=resp.headers.get('content-type', 'image/png'))
+            return _image_response(request, resp.content, resp.headers.get('content-type', 'image/png'))
     except httpx.HTTPStatusError as e:
         logger.error(f"Backend error: {e.response.text}")
         detail = e.response.text or "Error generating diagnostic visualization by age"
@@ -1,7 +1,8 @@
-from fastapi import APIRouter, HTTPException, Query, Path, BackgroundTasks
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi import APIRouter, HTTPException, Query, Path, BackgroundTasks, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
+import hashlib
 import httpx
 import logging
 
@@ -54,16 +55,31 @@ async def get_module_content(module_name: str):
 
 
 @router.get("/list-all-patients", response_class=JSONResponse)
-async def list_all_patients():
+async def list_all_patients(
+    request: Request,
+    offset: int = Query(0, ge=0, description="Index of the first patient to return"),
+    limit: Optional[int] = Query(None, ge=1, description="Maximum number of patients to return (default: all)")
+):
     """
-    Get a list of all patients with their cohort IDs, date of birth, and display/text fields from the HAPI FHIR server.
+    Get a list of patients with their cohort IDs, date of birth, and display/text fields from the HAPI FHIR server.
+    Use offset/limit to page through large patient sets; total_patients always reports the full count.
+    Responses carry an ETag; send it back in If-None-Match to get 304 Not Modified for an unchanged page.
     """
     url = f"{settings.synthea_server_url}/list-all-patients"
+    params = {"offset": offset}
+    if limit is not None:
+        params["limit"] = limit
     try:
         async with httpx.AsyncClient(timeout=30.0) as client:
-            resp = await client.get(url)
+            resp = await client.get(url, params=params)
             resp.raise_for_status()
-            return resp.json()
+            # Relay the backend's JSON bytes as-is (no decode/re-encode); GZipMiddleware compresses them.
+            # A content hash ETag lets clients holding the same page skip the download (304).
+            etag = f'"{hashlib.sha256(resp.content).hexdigest()[:32]}"'
+            if_none_match = request.headers.get("if-none-match", "")
+            if etag in (tag.strip() for tag in if_none_match.split(",")):
+                return Response(status_code=304, headers={"ETag": etag})
+            return Response(content=resp.content, media_type="application/json", headers={"ETag": etag})
     except httpx.HTTPStatusError as e:
         logger.error(f"Synthea error (list-all-patients): {e.response.text}")
         detail = e.response.text or "Error fetching patients list"
@@ -73,6 +89,26 @@ async def list_all_patients():
         raise HTTPException(status_code=500, detail="Synthea server unreachable")
 
 
+@router.get("/patient-stats", response_class=JSONResponse)
+async def patient_stats():
+    """
+    Get aggregate patient demographics (total, counts per gender and per cohort, average age).
+    """
+    url = f"{settings.synthea_server_url}/patient-stats"
+    try:
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            resp = await client.get(url)
+            resp.raise_for_status()
+            return resp.json()
+    except httpx.HTTPStatusError as e:
+        logger.error(f"Synthea error (patient-stats): {e.response.text}")
+        detail = e.response.text or "Error fetching patient statistics"
+        raise HTTPException(status_code=e.response.status_code, detail=detail)
+    except httpx.RequestError as e:
+        logger.error(f"Error fetching patient statistics: {e}")
+        raise HTTPException(status_code=500, detail="Synthea server unreachable")
+
+
 @router.get("/list-all-cohorts", response_class=JSONResponse)
 async def list_all_cohorts():
     """
@@ -227,6 +263,10 @@ class SyntheaAsyncRequest(BaseModel):
     use_population_sampling: bool = Field(True, description="Sample states by population if no state specified")
 
 
+class JobStatusRequest(BaseModel):
+    job_ids: List[str] = Field(..., max_length=500, description="IDs of the jobs to report on")
+
+
 # New async job management endpoints
 
 @router.post("/synthetic-patients", response_class=JSONResponse)
@@ -267,6 +307,25 @@ async def get_job_status(job_id: str):
         raise HTTPException(status_code=500, detail="Synthea server unreachable")
 
 
+@router.post("/synthetic-patients/jobs/status", response_class=JSONResponse)
+async def get_job_statuses(request: JobStatusRequest):
+    """Get the status of several generation jobs in one call"""
+    url = f"{settings.synthea_server_url}/synthetic-patients/jobs/status"
+    
+    try:
+        async with httpx.AsyncClient(timeout=15.0) as client:
+            resp = await client.post(url, json=request.model_dump())
+            resp.raise_for_status()
+            return resp.json()
+    except httpx.HTTPStatusError as e:
+        logger.error(f"Synthea backend error (job statuses): {e.response.text}")
+        detail = e.response.text or "Error getting job statuses"
+        raise HTTPException(status_code=e.response.status_code, detail=detail)
+    except httpx.RequestError as e:
+        logger.error(f"Error contacting Synthea backend (job statuses): {e}")
+        raise HTTPException(status_code=500, detail="Synthea server unreachable")
+
+
 @router.get("/synthetic-patients/jobs", response_class=JSONResponse)
 async def list_all_jobs():
     """List all synthetic patient generation jobs"""
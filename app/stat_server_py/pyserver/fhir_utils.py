@@ -13,6 +13,7 @@ import io
 import numpy as np
 import matplotlib.pyplot as plt
 from fastapi import HTTPException, Response, Query
+from fastapi.concurrency import run_in_threadpool
 from typing import Dict, List, Set, Any, Optional, Tuple
 from datetime import datetime
 
@@ -61,10 +62,12 @@ class FHIRResourceProcessor:
             url = f"{self.hapi_url}/{resource_type}?{query_string}"
             
             logger.info(f"Making direct FHIR API call to: {url}")
-            response = requests.get(url)
+            # The request and the decode of the (large) bundle run in the threadpool, so
+            # other requests, or other resource kinds of the same request, aren't held up
+            response = await run_in_threadpool(requests.get, url)
             response.raise_for_status()
             
-            return response.json()
+            return await run_in_threadpool(response.json)
         except requests.RequestException as e:
             error_msg = f"Error connecting to HAPI FHIR server: {str(e)}"
             logger.error(error_msg)
@@ -241,6 +244,10 @@ class FHIRResourceProcessor:
             patients = {}
             patients_by_id = {}  # Will store formatted patient details by ID
             
+            # Read the clock once for every patient's age
+            today = datetime.now().date()
+            today_key = (today.month, today.day)
+            
             for entry in bundle['entry']:
                 if 'resource' not in entry:
                     continue
@@ -266,17 +273,13 @@ class FHIRResourceProcessor:
                                 age = None
                                 if birth_date:
                                     try:
-                                        birth_year = int(birth_date.split('-')[0])
-                                        current_year = datetime.now().year
-                                        age = current_year - birth_year
+                                        # FHIR allows partial dates (YYYY, YYYY-MM), so split rather than parse
+                                        date_parts = birth_date.split('-')
+                                        age = today.year - int(date_parts[0])
                                         
                                         # Adjust age if birthday hasn't occurred yet this year
-                                        if len(birth_date.split('-')) >= 3:
-                                            birth_month = int(birth_date.split('-')[1])
-                                            birth_day = int(birth_date.split('-')[2])
-                                            today = datetime.now()
-                                            if (today.month, today.day) < (birth_month, birth_day):
-                                                age -= 1
+                                        if len(date_parts) >= 3 and today_key < (int(date_parts[1]), int(date_parts[2])):
+                                            age -= 1
                                     except Exception as e:
                                         logger.warning(f"Error calculating age from birthDate '{birth_date}': {str(e)}")
                                 
@@ -586,6 +589,10 @@ class FHIRResourceProcessor:
         total_patients = 0
         patients_with_age = 0
         
+        # A patient is listed under every resource they have, so parse each
+        # detail string's age once and reuse it
+        ages_by_detail = {}
+        
         # Process each resource and organize by age bracket
         for resource in resources:
             if "patients" not in resource:
@@ -606,7 +613,10 @@ class FHIRResourceProcessor:
             
             for patient_detail in resource["patients"]:
                 # Extract age from patient detail string
-                age = self._extract_age_from_patient_detail(patient_detail)
+                if patient_detail in ages_by_detail:
+                    age = ages_by_detail[patient_detail]
+                else:
+                    age = ages_by_detail[patient_detail] = self._extract_age_from_patient_detail(patient_detail)
                 if age is not None:
                     patients_with_age += 1
                     resource_has_age_data = True
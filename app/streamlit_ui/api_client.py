@@ -2,217 +2,722 @@
 API client functions for interacting with CHARMTwinsights backend services
 """
 
+import atexit
+import hashlib
+import mimetypes
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+import orjson
 import requests
-from typing import Dict, List, Any, Optional
-from config import API_BASE, SERVICES, DEFAULT_SETTINGS
+import streamlit as st
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Dict, List, Any, Optional, Tuple
+from config import (
+    API_BASE, API_ADDRESS, SERVICE_ITEMS, HEALTH_SUMMARY_PATH, SERVICE_SUMMARY_KEYS,
+    DEFAULT_SETTINGS, HEALTHCHECK_TIMEOUT
+)
+
+
+class CHARMClient:
+    """Typed HTTP client for the CHARMTwinsights router.
+
+    Holds a single requests.Session so connections are reused across calls,
+    and centralizes timeout and error handling for every backend endpoint.
+    """
+
+    def __init__(self, base: str):
+        self.base = base.rstrip("/")
+        self.session = requests.Session()
+        # Keep enough pooled connections for the concurrent health probes plus
+        # page requests from several sessions. Idempotent requests are retried on
+        # connection errors and on gateway errors while a backend is restarting;
+        # the last response is returned rather than raised once retries run out.
+        adapter = HTTPAdapter(
+            pool_connections=16,
+            pool_maxsize=32,
+            max_retries=Retry(total=2, backoff_factor=0.3,
+                              status_forcelist=(502, 503, 504), raise_on_status=False)
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # Nearly every endpoint returns JSON; image requests override this.
+        # requests already asks for gzip, which the router applies to large bodies.
+        self.session.headers["Accept"] = "application/json"
+
+    def _request(self, method: str, path: str, timeout: Optional[float] = None,
+                 **kwargs) -> requests.Response:
+        """Issue a request against the router and return the raw response"""
+        if timeout is None:
+            timeout = DEFAULT_SETTINGS["timeout"]
+        # Separate (connect, read) limits: slow endpoints keep their full read budget,
+        # but a router that isn't accepting connections is detected within seconds
+        connect_timeout = min(DEFAULT_SETTINGS["connect_timeout"], timeout)
+        return self.session.request(method, f"{self.base}{path}", timeout=(connect_timeout, timeout), **kwargs)
+
+    def _call(self, method: str, path: str, timeout: Optional[float] = None,
+              as_text: bool = False, **kwargs) -> Dict[str, Any]:
+        """Issue a request and wrap the JSON body in a success/error result dict.
+
+        With as_text the body is returned undecoded, for callers that only display it.
+        """
+        try:
+            response = self._request(method, path, timeout=timeout, **kwargs)
+            if response.status_code == 200:
+                return {"success": True, "data": response.text if as_text else orjson.loads(response.content)}
+            else:
+                return {"success": False, "error": response.text}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    def probe(self, url: str, timeout: float = 5) -> bool:
+        """Return True if the given health URL answers with HTTP 200.
+
+        Uses HEAD so no body is transferred; endpoints that reject HEAD fall back
+        to a streamed GET that is closed without reading the body.
+        """
+        try:
+            response = self.session.head(url, timeout=timeout, allow_redirects=False)
+            if response.status_code == 405:
+                with self.session.get(url, timeout=timeout, stream=True) as response:
+                    return response.status_code == 200
+            return response.status_code == 200
+        except Exception:
+            return False
+
+    def health_summary(self, timeout: float) -> Optional[Dict[str, bool]]:
+        """Fetch the router's aggregate health map, or None if the router doesn't provide one"""
+        response = self._request("GET", HEALTH_SUMMARY_PATH, timeout=timeout)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return orjson.loads(response.content)
+
+    def list_models(self) -> List[Dict[str, Any]]:
+        response = self._request("GET", "/modeling/models")
+        response.raise_for_status()
+        return orjson.loads(response.content)
+
+    def predict(self, image: str, inputs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return self._call("POST", "/modeling/predict",
+                          json={"image": image, "input": inputs}, timeout=30)
+
+    def search_patients(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return self._call("GET", "/stats/patients", params=params)
+
+    def get_patient_details(self, patient_id: str, as_text: bool = False) -> Dict[str, Any]:
+        return self._call("GET", f"/stats/patients/{patient_id}/$everything", as_text=as_text)
+
+    def list_patients(self, offset: int = 0, limit: Optional[int] = None,
+                      etag: Optional[str] = None) -> requests.Response:
+        """Fetch a listing page; given the ETag of a held copy, a 304 means that copy is current"""
+        params = {"offset": offset}
+        if limit is not None:
+            params["limit"] = limit
+        headers = {"If-None-Match": etag} if etag else None
+        return self._request("GET", "/synthetic/synthea/list-all-patients", params=params, headers=headers)
+
+    def patient_stats(self) -> Dict[str, Any]:
+        return self._call("GET", "/synthetic/synthea/patient-stats")
+
+    def list_cohorts(self) -> Dict[str, Any]:
+        return self._call("GET", "/synthetic/synthea/list-all-cohorts")
+
+    def delete_cohort(self, cohort_id: str) -> Dict[str, Any]:
+        return self._call("DELETE", f"/synthetic/synthea/cohort/{cohort_id}", timeout=30)
+
+    def generate_cohort(self, request_data: Dict[str, Any]) -> Dict[str, Any]:
+        return self._call("POST", "/synthetic/synthea/synthetic-patients",
+                          json=request_data, timeout=30)
+
+    def get_job(self, job_id: str) -> Dict[str, Any]:
+        return self._call("GET", f"/synthetic/synthea/synthetic-patients/jobs/{job_id}")
+
+    def get_jobs(self, job_ids: List[str]) -> Optional[Dict[str, Any]]:
+        """Fetch several jobs' statuses in one request, or None if the router doesn't provide the batch endpoint"""
+        response = self._request("POST", "/synthetic/synthea/synthetic-patients/jobs/status",
+                                 json={"job_ids": job_ids})
+        # Older routers only route GET/DELETE under /jobs/{job_id}
+        if response.status_code in (404, 405):
+            return None
+        response.raise_for_status()
+        return orjson.loads(response.content)
+
+    def list_jobs(self) -> Dict[str, Any]:
+        return self._call("GET", "/synthetic/synthea/synthetic-patients/jobs")
+
+    def cancel_job(self, job_id: str) -> Dict[str, Any]:
+        return self._call("DELETE", f"/synthetic/synthea/synthetic-patients/jobs/{job_id}")
+
+    def list_states(self) -> Dict[str, Any]:
+        return self._call("GET", "/synthetic/synthea/demographics/states")
+
+    def list_cities(self, state: str) -> Dict[str, Any]:
+        return self._call("GET", f"/synthetic/synthea/demographics/cities/{state}")
+
+    def get_resource(self, path: str, params: Optional[Dict[str, Any]] = None,
+                     timeout: Optional[float] = None, stream: bool = False,
+                     headers: Optional[Dict[str, str]] = None) -> requests.Response:
+        """Fetch a raw response (used for non-JSON payloads such as images)"""
+        return self._request("GET", path, params=params, timeout=timeout, stream=stream, headers=headers)
+
+    def get_json(self, path: str) -> Dict[str, Any]:
+        return self._call("GET", path)
+
+
+@st.cache_resource
+def get_client() -> CHARMClient:
+    """Shared CHARMClient, created once per Streamlit server process"""
+    return CHARMClient(API_BASE)
+
+
+# Long-lived worker pool for health probes, so each sweep only submits work
+# instead of spawning and tearing down a fresh set of threads
+_probe_executor = ThreadPoolExecutor(max_workers=len(SERVICE_ITEMS), thread_name_prefix="health-probe")
 
 
-def check_service_health() -> Dict[str, bool]:
-    """Check health status of all services"""
+# Upper bound on a whole sweep: a probe may need a HEAD and a fallback GET, and one
+# slow service must not hold up the status of the others beyond that
+_SWEEP_DEADLINE = 3 * HEALTHCHECK_TIMEOUT
+
+
+def _api_reachable() -> bool:
+    """Return True if a TCP connection to the router's host and port can be opened"""
+    try:
+        socket.create_connection(API_ADDRESS, timeout=HEALTHCHECK_TIMEOUT).close()
+        return True
+    except OSError:
+        return False
+
+
+# The router's /healthz/all probes the backends itself (up to 2s each, concurrently)
+_SUMMARY_TIMEOUT = max(_SWEEP_DEADLINE, 3.0)
+# Cleared once the router answers 404, i.e. predates the aggregate endpoint
+_summary_supported = True
+
+# Whether any probe got an answer on the previous sweep. While the router is up the
+# session pool holds keep-alive connections to it, so the extra TCP check is skipped.
+_router_answered = False
+
+
+def _probe_services(client: CHARMClient) -> Dict[str, bool]:
+    """Report every service's health: one aggregate call if the router has it, else concurrent probes"""
+    global _router_answered, _summary_supported
+    # Every health URL goes through the router, so if its host is down they all are
+    if not _router_answered and not _api_reachable():
+        return {service_name: False for service_name, _ in SERVICE_ITEMS}
+
+    # One aggregate request when the router supports it; individual probes otherwise
+    if _summary_supported:
+        try:
+            summary = client.health_summary(_SUMMARY_TIMEOUT)
+        except Exception:
+            summary = {}
+        if summary is None:
+            _summary_supported = False
+        elif summary:
+            _router_answered = True
+            return {service_name: bool(summary.get(SERVICE_SUMMARY_KEYS[service_name], False))
+                    for service_name, _ in SERVICE_ITEMS}
+
     health_status = {}
-    for service_name, url in SERVICES.items():
+    futures = {
+        _probe_executor.submit(client.probe, url, HEALTHCHECK_TIMEOUT): service_name
+        for service_name, url in SERVICE_ITEMS
+    }
+    try:
+        for future in as_completed(futures, timeout=_SWEEP_DEADLINE):
+            # A probe that blows up (rather than returning False) must not poison the sweep
+            try:
+                health_status[futures[future]] = future.result()
+            except Exception:
+                health_status[futures[future]] = False
+    except FuturesTimeoutError:
+        # Probes still running past the deadline are reported offline
+        pass
+    _router_answered = any(health_status.values())
+    # Preserve the configured service order for display
+    return {service_name: health_status.get(service_name, False) for service_name, _ in SERVICE_ITEMS}
+
+
+# Last known health status, shared by all sessions and refreshed in the background
+_health_cache: Dict[str, Any] = {"status": None, "timestamp": 0.0, "inflight": False, "initial": None}
+_health_lock = threading.Lock()
+
+# Runs whole health sweeps (the first one and background revalidations) and the
+# start-up model list prefetch off the script thread; at most one sweep is ever in
+# flight, so two long-lived workers let the prefetch run alongside it
+_background_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="background-fetch")
+
+
+def _refresh_health(client: CHARMClient) -> None:
+    """Background worker that re-probes all services and stores the result"""
+    status = None
+    try:
+        status = _probe_services(client)
+    finally:
+        with _health_lock:
+            if status is not None:
+                _health_cache["status"] = status
+                _health_cache["timestamp"] = time.time()
+            _health_cache["inflight"] = False
+
+
+def _initial_health_sweep(client: CHARMClient) -> Future:
+    """Return the shared future for the first probe sweep, starting it if needed.
+
+    Must be called with _health_lock held.
+    """
+    if _health_cache["initial"] is None:
+        _health_cache["inflight"] = True
+        _health_cache["initial"] = _background_executor.submit(_refresh_health, client)
+    return _health_cache["initial"]
+
+
+def prefetch_service_health() -> None:
+    """Start the first health sweep in the background so it overlaps with page rendering"""
+    client = get_client()
+    with _health_lock:
+        if _health_cache["status"] is None:
+            _initial_health_sweep(client)
+
+
+def refresh_service_health() -> Dict[str, bool]:
+    """Re-probe every service now, bypassing the cached status, and store the result"""
+    status = _probe_services(get_client())
+    with _health_lock:
+        _health_cache["status"] = status
+        _health_cache["timestamp"] = time.time()
+    return dict(status)
+
+
+def check_service_health_swr() -> Dict[str, bool]:
+    """Return the last known health status, revalidating it in the background when stale.
+
+    Only the very first sweep blocks (and is shared by every caller waiting on it);
+    afterwards the cached status is returned immediately and is at most one refresh
+    interval out of date.
+    """
+    client = get_client()
+    initial = None
+    with _health_lock:
+        cached = _health_cache["status"]
+        age = time.time() - _health_cache["timestamp"]
+        start_refresh = (cached is not None
+                         and age > DEFAULT_SETTINGS["health_refresh_interval"]
+                         and not _health_cache["inflight"])
+        if start_refresh:
+            _health_cache["inflight"] = True
+        elif cached is None:
+            initial = _initial_health_sweep(client)
+
+    if initial is not None:
+        initial.result()
+        with _health_lock:
+            cached = _health_cache["status"]
+        if cached is None:
+            cached = _probe_services(client)
+    elif start_refresh:
+        _background_executor.submit(_refresh_health, client)
+
+    return dict(cached)
+
+
+# Last known-good responses, served (flagged stale) when a backend call fails
+_last_good: Dict[str, Dict[str, Any]] = {}
+
+
+def _fetch_with_fallback(key: str, fetch):
+    """Call fetch(), remembering its result; on failure return the last good value.
+
+    Raises the original exception only if no good value has been seen yet.
+    """
+    try:
+        value = fetch()
+    except Exception:
+        entry = _last_good.get(key)
+        if entry is None:
+            raise
+        entry["stale"] = True
+        return entry["value"]
+    _last_good[key] = {"value": value, "timestamp": time.time(), "stale": False}
+    return value
+
+
+def stale_age(key: str) -> Optional[float]:
+    """Seconds since the last good value for key, if that value is currently being served stale"""
+    entry = _last_good.get(key)
+    if entry and entry["stale"]:
+        return time.time() - entry["timestamp"]
+    return None
+
+
+# Model list requested in the background when the first script run starts, so the
+# first page that needs it usually finds the response already there
+_models_prefetch: Dict[str, Any] = {"started": False, "future": None}
+_models_prefetch_lock = threading.Lock()
+
+
+def prefetch_models() -> None:
+    """Start fetching the model list in the background (once per process)"""
+    with _models_prefetch_lock:
+        if _models_prefetch["started"]:
+            return
+        _models_prefetch["started"] = True
+        _models_prefetch["future"] = _background_executor.submit(get_client().list_models)
+
+
+def _take_models_prefetch() -> Optional[Future]:
+    with _models_prefetch_lock:
+        future, _models_prefetch["future"] = _models_prefetch["future"], None
+    return future
+
+
+# A cache_resource entry is handed out as-is rather than unpickled into a fresh
+# copy on every hit, so each page load in every session reuses one parsed list.
+# Callers treat the catalog as read-only.
+@st.cache_resource(ttl=120, show_spinner=False)
+def _fetch_models() -> List[Dict[str, Any]]:
+    # Consume the start-up prefetch if there is one; fall back to a fresh request
+    prefetched = _take_models_prefetch()
+    if prefetched is not None:
         try:
-            response = requests.get(url, timeout=5)
-            health_status[service_name] = response.status_code == 200
+            return prefetched.result(timeout=DEFAULT_SETTINGS["timeout"])
         except Exception:
-            health_status[service_name] = False
-    return health_status
+            pass
+    return get_client().list_models()
+
+
+def clear_models_cache() -> None:
+    """Force the next get_available_models() call to refetch the catalog"""
+    _fetch_models.clear()
 
 
 def get_available_models() -> List[Dict[str, Any]]:
-    """Get list of available models"""
+    """Get list of available models (cached, falling back to the last known list)"""
     try:
-        response = requests.get(f"{API_BASE}/modeling/models", timeout=DEFAULT_SETTINGS["timeout"])
-        if response.status_code == 200:
-            return response.json()
-        return []
+        return _fetch_with_fallback("models", _fetch_models)
     except Exception:
         return []
 
 
+@st.cache_data(ttl=60, show_spinner=False)
+def _fetch_cohort_ids() -> List[str]:
+    result = get_client().list_cohorts()
+    if not result["success"]:
+        raise RuntimeError(result["error"])
+    data = result["data"]
+    if data and "cohorts" in data:
+        cohorts = data["cohorts"]
+        return [cohort.get("cohort_id") for cohort in cohorts if cohort.get("cohort_id")]
+    return []
+
+
 def get_available_cohorts() -> List[str]:
-    """Get list of available cohorts for dropdown selection"""
+    """Get list of available cohorts for dropdown selection (cached for a minute)"""
     try:
-        response = requests.get(f"{API_BASE}/synthetic/synthea/list-all-cohorts", timeout=DEFAULT_SETTINGS["timeout"])
-        if response.status_code == 200:
-            data = response.json()
-            if data and "cohorts" in data:
-                cohorts = data["cohorts"]
-                return [cohort.get("cohort_id") for cohort in cohorts if cohort.get("cohort_id")]
-        return []
+        return _fetch_cohort_ids()
     except Exception:
         return []
 
 
-def search_patients(name: Optional[str] = None, gender: Optional[str] = None, 
+def search_patients(name: Optional[str] = None, gender: Optional[str] = None,
                    birth_date: Optional[str] = None, count: int = 20) -> Dict[str, Any]:
     """Search patients using the stats API"""
+    params = {"_count": count}
+    if name:
+        params["name"] = name
+    if gender and gender != "All":
+        params["gender"] = gender
+    if birth_date:
+        params["birthdate"] = birth_date
+
+    return get_client().search_patients(params)
+
+
+def get_patient_details(patient_id: str, as_text: bool = False) -> Dict[str, Any]:
+    """Get detailed information for a specific patient (as raw JSON text if as_text)"""
+    return get_client().get_patient_details(patient_id, as_text=as_text)
+
+
+# Last listing page seen per (offset, limit) with its ETag, so an expired cache entry
+# is revalidated with If-None-Match and an unchanged page isn't downloaded or decoded again
+_PATIENT_PAGE_CACHE_SIZE = 16
+_patient_pages: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+_patient_pages_lock = threading.Lock()
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _fetch_synthetic_patients(offset: int = 0, limit: Optional[int] = None) -> Tuple[Dict[str, Any], str]:
+    """Fetch a page of the synthetic patient listing and its ETag, raising on failure so errors are never cached"""
+    key = (offset, limit)
+    with _patient_pages_lock:
+        cached = _patient_pages.get(key)
+    response = get_client().list_patients(offset, limit, etag=cached["etag"] if cached else None)
+    if response.status_code == 304 and cached:
+        return cached["data"], cached["etag"]
+    if response.status_code != 200:
+        raise RuntimeError(response.text)
+    data = orjson.loads(response.content)
+    # The router's ETag is a hash of these same bytes; compute it here if it didn't send one,
+    # so every page has a content key that callers can memoize derived tables on
+    etag = response.headers.get("ETag") or f'"{hashlib.sha256(response.content).hexdigest()[:32]}"'
+    with _patient_pages_lock:
+        _patient_pages.pop(key, None)
+        _patient_pages[key] = {"etag": etag, "data": data}
+        while len(_patient_pages) > _PATIENT_PAGE_CACHE_SIZE:
+            _patient_pages.popitem(last=False)
+    return data, etag
+
+
+def list_all_synthetic_patients(offset: int = 0, limit: Optional[int] = None) -> Dict[str, Any]:
+    """List synthetic patients from Synthea, optionally one page at a time (cached for a minute).
+
+    The result carries the page's ETag, a hash of its content that identifies
+    unchanged listings across fetches.
+    """
     try:
-        params = {"_count": count}
-        if name:
-            params["name"] = name
-        if gender and gender != "All":
-            params["gender"] = gender
-        if birth_date:
-            params["birthdate"] = birth_date
-        
-        response = requests.get(f"{API_BASE}/stats/patients", params=params, timeout=DEFAULT_SETTINGS["timeout"])
-        
-        if response.status_code == 200:
-            return {"success": True, "data": response.json()}
-        else:
-            return {"success": False, "error": response.text}
+        data, etag = _fetch_synthetic_patients(offset, limit)
+        return {"success": True, "data": data, "etag": etag}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
 
-def get_patient_details(patient_id: str) -> Dict[str, Any]:
-    """Get detailed information for a specific patient"""
-    try:
-        response = requests.get(f"{API_BASE}/stats/patients/{patient_id}/$everything", timeout=DEFAULT_SETTINGS["timeout"])
-        if response.status_code == 200:
-            return {"success": True, "data": response.json()}
-        else:
-            return {"success": False, "error": response.text}
-    except Exception as e:
-        return {"success": False, "error": str(e)}
+def clear_data_caches() -> None:
+    """Drop every cached view of the server's patients and cohorts after they change.
 
+    Cohort ids, listing pages, statistics and resource summaries are all cleared together,
+    so a finished job or a deleted cohort shows up everywhere on the next request.
+    """
+    _fetch_cohort_ids.clear()
+    _fetch_synthetic_patients.clear()
+    _fetch_patient_stats.clear()
+    _fetch_resource_summary.clear()
 
-def list_all_synthetic_patients() -> Dict[str, Any]:
-    """List all synthetic patients from Synthea"""
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _fetch_patient_stats() -> Dict[str, Any]:
+    result = get_client().patient_stats()
+    if not result["success"]:
+        raise RuntimeError(result["error"])
+    return result["data"]
+
+
+def get_patient_stats() -> Dict[str, Any]:
+    """Get aggregate gender/cohort/age statistics over all synthetic patients"""
     try:
-        response = requests.get(f"{API_BASE}/synthetic/synthea/list-all-patients", timeout=DEFAULT_SETTINGS["timeout"])
-        if response.status_code == 200:
-            return {"success": True, "data": response.json()}
-        else:
-            return {"success": False, "error": response.text}
+        return {"success": True, "data": _fetch_patient_stats()}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
 
 def list_all_cohorts() -> Dict[str, Any]:
     """List all available cohorts"""
-    try:
-        response = requests.get(f"{API_BASE}/synthetic/synthea/list-all-cohorts", timeout=DEFAULT_SETTINGS["timeout"])
-        if response.status_code == 200:
-            return {"success": True, "data": response.json()}
-        else:
-            return {"success": False, "error": response.text}
-    except Exception as e:
-        return {"success": False, "error": str(e)}
+    return get_client().list_cohorts()
 
 
 def delete_cohort(cohort_id: str) -> Dict[str, Any]:
     """Delete a cohort"""
-    try:
-        response = requests.delete(f"{API_BASE}/synthetic/synthea/cohort/{cohort_id}", timeout=30)
-        if response.status_code == 200:
-            return {"success": True, "data": response.json()}
-        else:
-            return {"success": False, "error": response.text}
-    except Exception as e:
-        return {"success": False, "error": str(e)}
+    result = get_client().delete_cohort(cohort_id)
+    if result["success"]:
+        # Cached dropdowns, listings and stats would otherwise still show the deleted cohort
+        clear_data_caches()
+    return result
 
 
 def generate_synthetic_patients(num_patients: int, num_years: int, cohort_id: str,
-                              export_format: str = "fhir", min_age: int = 0, 
+                              export_format: str = "fhir", min_age: int = 0,
                               max_age: int = 140, gender: str = "both",
                               state: Optional[str] = None, city: Optional[str] = None,
                               use_population_sampling: bool = True) -> Dict[str, Any]:
     """Generate synthetic patients using async job system via router"""
-    try:
-        url = f"{API_BASE}/synthetic/synthea/synthetic-patients"
-        
-        data = {
-            "num_patients": num_patients,
-            "num_years": num_years,
-            "cohort_id": cohort_id,
-            "exporter": export_format,
-            "min_age": min_age,
-            "max_age": max_age,
-            "gender": gender,
-            "use_population_sampling": use_population_sampling
-        }
-        
-        if state:
-            data["state"] = state
-        if city:
-            data["city"] = city
-        
-        response = requests.post(url, json=data, timeout=30)
-        
-        if response.status_code == 200:
-            return {"success": True, "data": response.json()}
-        else:
-            return {"success": False, "error": response.text}
-    except Exception as e:
-        return {"success": False, "error": str(e)}
+    data = {
+        "num_patients": num_patients,
+        "num_years": num_years,
+        "cohort_id": cohort_id,
+        "exporter": export_format,
+        "min_age": min_age,
+        "max_age": max_age,
+        "gender": gender,
+        "use_population_sampling": use_population_sampling
+    }
+
+    if state:
+        data["state"] = state
+    if city:
+        data["city"] = city
+
+    return get_client().generate_cohort(data)
+
+
+# Downloaded visualization images keyed by request, so an unchanged chart is
+# revalidated with If-None-Match and served from disk on a 304
+_VIZ_CACHE_SIZE = 32
+_viz_cache: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+_viz_lock = threading.Lock()
+
+
+def _remove_files(paths: List[str]) -> None:
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _remember_image(key: Tuple, entry: Dict[str, Any]) -> None:
+    """Store a downloaded image, deleting files that are replaced or evicted"""
+    with _viz_lock:
+        old = _viz_cache.pop(key, None)
+        _viz_cache[key] = entry
+        stale = [old["content_path"]] if old else []
+        while len(_viz_cache) > _VIZ_CACHE_SIZE:
+            stale.append(_viz_cache.popitem(last=False)[1]["content_path"])
+    _remove_files(stale)
+
+
+@atexit.register
+def _clear_image_cache() -> None:
+    with _viz_lock:
+        paths = [entry["content_path"] for entry in _viz_cache.values()]
+        _viz_cache.clear()
+    _remove_files(paths)
+
+
+def _read_cached_image(key: Tuple, entry: Dict[str, Any]) -> Optional[bytes]:
+    """Read a cached image's bytes, or None if another session replaced or evicted it.
+
+    Reading under the lock keeps _remember_image from deleting the file mid-read.
+    """
+    with _viz_lock:
+        if _viz_cache.get(key) is not entry:
+            return None
+        try:
+            with open(entry["content_path"], "rb") as f:
+                return f.read()
+        except OSError:
+            _viz_cache.pop(key, None)
+            return None
 
 
-def get_visualization_image(endpoint: str, limit: int, cohort_filter: Optional[str] = None, 
+def get_visualization_image(endpoint: str, limit: int, cohort_filter: Optional[str] = None,
                           bracket_size: Optional[int] = None) -> Dict[str, Any]:
-    """Get visualization image from stats API"""
+    """Get visualization image from stats API.
+
+    Images are streamed to a temporary file rather than buffered in the response. The
+    file is owned by a small cache shared by all sessions and revalidated by ETag on the
+    next identical request; the image bytes are returned in ``content``.
+    """
     try:
         params = {"limit": limit}
         if cohort_filter:
             params["cohort_id"] = cohort_filter
         if bracket_size is not None:
             params["bracket_size"] = bracket_size
-        
-        response = requests.get(f"{API_BASE}{endpoint}", params=params, timeout=DEFAULT_SETTINGS["visualization_timeout"])
-        
-        if response.status_code == 200:
-            content_type = response.headers.get('content-type', '').lower()
-            return {
-                "success": True, 
-                "content": response.content,
-                "content_type": content_type
-            }
-        else:
-            return {"success": False, "error": f"HTTP {response.status_code}: {response.text}"}
+
+        key = (endpoint, tuple(sorted(params.items())))
+        # Revalidate first; if the cached file is gone by the time of the 304, fetch afresh
+        for revalidate in (True, False):
+            with _viz_lock:
+                cached = _viz_cache.get(key)
+                if cached is not None:
+                    _viz_cache.move_to_end(key)
+            headers = {"Accept": "image/png"}
+            if revalidate and cached and cached["etag"]:
+                headers["If-None-Match"] = cached["etag"]
+
+            response = get_client().get_resource(endpoint, params=params,
+                                                 timeout=DEFAULT_SETTINGS["visualization_timeout"],
+                                                 stream=True, headers=headers)
+            try:
+                if response.status_code == 304 and cached is not None:
+                    content = _read_cached_image(key, cached)
+                    if content is None:
+                        continue
+                    return {"success": True, "content": content, "content_type": cached["content_type"]}
+                if response.status_code != 200:
+                    return {"success": False, "error": f"HTTP {response.status_code}: {response.text}"}
+
+                content_type = response.headers.get('content-type', '').lower()
+                if 'image' not in content_type:
+                    # Error payloads are small; read them whole
+                    return {"success": True, "content": response.content, "content_type": content_type}
+
+                response.raw.decode_content = True
+                suffix = mimetypes.guess_extension(content_type.split(';')[0].strip()) or ""
+                with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as f:
+                    shutil.copyfileobj(response.raw, f, length=64 * 1024)
+                # Read back before the file is shared; from then on another session may replace it
+                with open(f.name, "rb") as saved:
+                    content = saved.read()
+                _remember_image(key, {"content_path": f.name, "content_type": content_type,
+                                      "etag": response.headers.get("ETag")})
+                return {"success": True, "content": content, "content_type": content_type}
+            finally:
+                response.close()
+        return {"success": False, "error": "Cached image disappeared during revalidation"}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
 
+@st.cache_data(ttl=300, show_spinner=False)
+def _run_prediction(model_image: str, input_json: str) -> Dict[str, Any]:
+    """Run a prediction keyed on the canonical JSON of its input; failures raise so they aren't cached"""
+    result = get_client().predict(model_image, orjson.loads(input_json))
+    if not result["success"]:
+        raise RuntimeError(result["error"])
+    return result["data"]
+
+
+def clear_prediction_cache() -> None:
+    """Drop memoized prediction results so the next run hits the model server"""
+    _run_prediction.clear()
+
+
 def predict_with_model(model_image: str, input_data: List[Dict[str, Any]]) -> Dict[str, Any]:
-    """Run prediction with a model"""
+    """Run prediction with a model (identical requests are served from cache for 5 minutes)"""
     try:
-        predict_data = {
-            "image": model_image,
-            "input": input_data
-        }
-        
-        response = requests.post(
-            f"{API_BASE}/modeling/predict",
-            json=predict_data,
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            return {"success": True, "data": response.json()}
-        else:
-            return {"success": False, "error": response.text}
+        input_json = orjson.dumps(input_data, option=orjson.OPT_SORT_KEYS).decode()
+        return {"success": True, "data": _run_prediction(model_image, input_json)}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
 
+RESOURCE_ENDPOINTS = {
+    "conditions": "/stats/all-patient-conditions",
+    "observations": "/stats/all-patient-observations",
+    "procedures": "/stats/all-patient-procedures",
+}
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _fetch_resource_summary(resource_type: str) -> str:
+    """Fetch one all-patient summary; failures raise so they aren't cached.
+
+    The summary is kept as serialized JSON: it is only ever displayed, and cache hits
+    then copy one string rather than rebuilding the nested objects.
+    """
+    result = get_client().get_json(RESOURCE_ENDPOINTS[resource_type])
+    if not result["success"]:
+        raise RuntimeError(result["error"])
+    return orjson.dumps(result["data"]).decode()
+
+
 def load_resource_data(resource_type: str) -> Dict[str, Any]:
-    """Load data for a specific resource type (conditions, observations, procedures)"""
+    """Load data for a specific resource type (conditions, observations, procedures) as JSON text"""
+    if resource_type not in RESOURCE_ENDPOINTS:
+        return {"success": False, "error": f"Unknown resource type: {resource_type}"}
+
+    # Only the clicked kind is requested: each kind is a full HAPI scan on the stats server
     try:
-        endpoint_map = {
-            "conditions": "/stats/all-patient-conditions",
-            "observations": "/stats/all-patient-observations", 
-            "procedures": "/stats/all-patient-procedures"
-        }
-        
-        if resource_type not in endpoint_map:
-            return {"success": False, "error": f"Unknown resource type: {resource_type}"}
-        
-        response = requests.get(f"{API_BASE}{endpoint_map[resource_type]}", timeout=DEFAULT_SETTINGS["timeout"])
-        if response.status_code == 200:
-            return {"success": True, "data": response.json()}
-        else:
-            return {"success": False, "error": response.text}
+        return {"success": True, "data": _fetch_resource_summary(resource_type)}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
@@ -221,61 +726,54 @@ def load_resource_data(resource_type: str) -> Dict[str, Any]:
 
 def get_job_status(job_id: str) -> Dict[str, Any]:
     """Get the status of a synthetic patient generation job"""
-    try:
-        response = requests.get(f"{API_BASE}/synthetic/synthea/synthetic-patients/jobs/{job_id}", timeout=DEFAULT_SETTINGS["timeout"])
-        if response.status_code == 200:
-            return {"success": True, "data": response.json()}
-        else:
-            return {"success": False, "error": response.text}
-    except Exception as e:
-        return {"success": False, "error": str(e)}
+    return get_client().get_job(job_id)
+
+
+# Fans per-job status requests out when the router predates the batch endpoint;
+# cleared once the router answers that it doesn't have it
+_job_status_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="job-status")
+_bulk_status_supported = True
+
+
+def get_jobs_bulk(job_ids: List[str]) -> Dict[str, Any]:
+    """Get the status of several generation jobs ({"jobs": [...], "not_found": [...]}).
+
+    One batch request when the router supports it; otherwise the individual
+    status calls are issued concurrently, so a refresh costs ~ceil(N/8) round trips.
+    """
+    global _bulk_status_supported
+    client = get_client()
+    if _bulk_status_supported:
+        try:
+            data = client.get_jobs(job_ids)
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+        if data is not None:
+            return {"success": True, "data": data}
+        _bulk_status_supported = False
+    
+    results = list(_job_status_executor.map(client.get_job, job_ids))
+    return {"success": True, "data": {
+        "jobs": [result["data"] for result in results if result["success"]],
+        "not_found": [job_id for job_id, result in zip(job_ids, results) if not result["success"]]
+    }}
 
 
 def list_all_jobs() -> Dict[str, Any]:
     """List all synthetic patient generation jobs"""
-    try:
-        response = requests.get(f"{API_BASE}/synthetic/synthea/synthetic-patients/jobs", timeout=DEFAULT_SETTINGS["timeout"])
-        if response.status_code == 200:
-            return {"success": True, "data": response.json()}
-        else:
-            return {"success": False, "error": response.text}
-    except Exception as e:
-        return {"success": False, "error": str(e)}
+    return get_client().list_jobs()
 
 
 def cancel_job(job_id: str) -> Dict[str, Any]:
     """Cancel a running generation job"""
-    try:
-        response = requests.delete(f"{API_BASE}/synthetic/synthea/synthetic-patients/jobs/{job_id}", timeout=DEFAULT_SETTINGS["timeout"])
-        if response.status_code == 200:
-            return {"success": True, "data": response.json()}
-        else:
-            return {"success": False, "error": response.text}
-    except Exception as e:
-        return {"success": False, "error": str(e)}
+    return get_client().cancel_job(job_id)
 
 
 def get_available_states() -> Dict[str, Any]:
     """Get list of available US states for patient generation"""
-    try:
-        response = requests.get(f"{API_BASE}/synthetic/synthea/demographics/states", timeout=DEFAULT_SETTINGS["timeout"])
-        if response.status_code == 200:
-            return {"success": True, "data": response.json()}
-        else:
-            return {"success": False, "error": response.text}
-    except Exception as e:
-        return {"success": False, "error": str(e)}
+    return get_client().list_states()
 
 
 def get_cities_for_state(state: str) -> Dict[str, Any]:
     """Get list of available cities for a specific state"""
-    try:
-        response = requests.get(f"{API_BASE}/synthetic/synthea/demographics/cities/{state}", timeout=DEFAULT_SETTINGS["timeout"])
-        if response.status_code == 200:
-            return {"success": True, "data": response.json()}
-        else:
-            return {"success": False, "error": response.text}
-    except Exception as e:
-        return {"success": False, "error": str(e)}
-
-
+    return get_client().list_cities(state)
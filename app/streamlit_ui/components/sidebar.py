@@ -3,7 +3,8 @@ Sidebar components for CHARMTwinsights
 """
 
 import streamlit as st
-from api_client import check_service_health
+from api_client import check_service_health_swr, refresh_service_health
+from config import HEALTHCHECK_TTL
 
 
 def show_navigation_sidebar():
@@ -16,20 +17,38 @@ def show_navigation_sidebar():
     return page
 
 
-def show_system_status_sidebar():
-    """Display system status in sidebar"""
-    st.sidebar.markdown("---")
-    st.sidebar.markdown("### System Status")
-    
-    health_status = check_service_health()
+@st.fragment(run_every=HEALTHCHECK_TTL)
+def _system_status_fragment():
+    """Service status lights, re-run on their own schedule without rerunning the page"""
+    # The button only reruns this fragment; it forces a fresh probe instead of the cached status
+    if st.button("🔄 Refresh", key="refresh_health"):
+        health_status = refresh_service_health()
+    else:
+        health_status = check_service_health_swr()
     for service, is_healthy in health_status.items():
         status_class = "status-healthy" if is_healthy else "status-unhealthy"
         status_text = "🟢 Online" if is_healthy else "🔴 Offline"
-        st.sidebar.markdown(f'<span class="{status_class}">{service}: {status_text}</span>', unsafe_allow_html=True)
+        st.markdown(f'<span class="{status_class}">{service}: {status_text}</span>', unsafe_allow_html=True)
+
+
+def show_system_status_sidebar(container=None):
+    """Display system status in sidebar (or in a slot reserved there earlier)"""
+    with container or st.sidebar:
+        st.markdown("---")
+        st.markdown("### System Status")
+        # Fragments may only write inside their own container, so render it within the sidebar
+        _system_status_fragment()
 
 
 def show_debug_options():
-    """Show debug options in sidebar"""
-    if st.sidebar.checkbox("Show Debug Info", key="debug"):
-        return True
-    return False
+    """Show debug options in sidebar (call once per run).
+
+    Returns the flags as {"raw": ..., "debug": ...}, also kept in
+    st.session_state["debug_opts"] for the pages to read.
+    """
+    debug_opts = {
+        "raw": st.sidebar.checkbox("Show Raw Data", key="show_raw_data"),
+        "debug": st.sidebar.checkbox("Show Debug Info", key="debug")
+    }
+    st.session_state["debug_opts"] = debug_opts
+    return debug_opts
@@ -3,17 +3,44 @@ Configuration settings for CHARMTwinsights Streamlit app
 """
 
 import os
+import re
+from types import MappingProxyType
+from urllib.parse import urlsplit
 
-# API Configuration
-API_BASE = os.getenv("API_BASE", "http://localhost:8000")
+# API Configuration - canonicalized once so every URL below is built the same way
+API_BASE = os.getenv("API_BASE", "http://localhost:8000").rstrip("/")
+_API_URL = urlsplit(API_BASE)
+_API_HOST = _API_URL.hostname or ""
+# (host, port) of the router, for a cheap TCP reachability check before HTTP probes
+API_ADDRESS = (_API_HOST, _API_URL.port or (443 if _API_URL.scheme == "https" else 80))
 
-# Service endpoints for health checks - all routed through the router service
-SERVICES = {
-    "Router": f"{API_BASE}/health",
-    "Model Server": f"{API_BASE}/modeling/health",
-    "Stats Server": f"{API_BASE}/stats/health", 
-    "Synthea Server": f"{API_BASE}/synthetic/health"
+# Health check paths for each service - all routed through the router service
+_SERVICE_HEALTH_PATHS = {
+    "Router": "/healthz",
+    "Model Server": "/modeling/health",
+    "Stats Server": "/stats/health",
+    "Synthea Server": "/synthetic/health"
 }
+# Resolved once at import and read-only thereafter; SERVICE_ITEMS is the same
+# mapping as a tuple, in display order, for the health probe loop
+SERVICES = MappingProxyType({name: f"{API_BASE}{path}" for name, path in _SERVICE_HEALTH_PATHS.items()})
+SERVICE_ITEMS = tuple(SERVICES.items())
+
+# The router can also report every service at once; these are the keys of its
+# /healthz/all response for each service above
+HEALTH_SUMMARY_PATH = "/healthz/all"
+SERVICE_SUMMARY_KEYS = MappingProxyType({
+    "Router": "router",
+    "Model Server": "modeling",
+    "Stats Server": "stats",
+    "Synthea Server": "synthea"
+})
+
+# Health probe tuning - local services answer almost instantly, remote deployments
+# may need longer. Both can be overridden from the environment.
+_IS_LOCAL_API = _API_HOST in ("localhost", "127.0.0.1", "::1")
+HEALTHCHECK_TIMEOUT = float(os.getenv("HEALTHCHECK_TIMEOUT", "0.5" if _IS_LOCAL_API else "2"))
+HEALTHCHECK_TTL = float(os.getenv("HEALTHCHECK_TTL", "15"))
 
 # Page configuration
 PAGE_CONFIG = {
@@ -24,7 +51,7 @@ PAGE_CONFIG = {
 }
 
 # Custom CSS for styling
-CUSTOM_CSS = """
+_CUSTOM_CSS_SOURCE = """
 <style>
     .main-header {
         font-size: 2.5rem;
@@ -70,8 +97,13 @@ CUSTOM_CSS = """
 </style>
 """
 
+# Collapse whitespace once at import; the block is re-sent to the browser on every rerun
+CUSTOM_CSS = re.sub(r"\s+", " ", _CUSTOM_CSS_SOURCE).strip()
+
 # Default settings
 DEFAULT_SETTINGS = {
     "timeout": 30,  # Increased from 10 to handle slower container startup
-    "visualization_timeout": 30
+    "connect_timeout": 3,  # Connecting should be near-instant; fail fast when the router is unreachable
+    "visualization_timeout": 30,
+    "health_refresh_interval": HEALTHCHECK_TTL  # Seconds before cached health status is revalidated
 }
@@ -7,7 +7,8 @@ AI model testing, and clinical prediction workflows.
 
 import streamlit as st
 from config import PAGE_CONFIG, CUSTOM_CSS
-from components.sidebar import show_navigation_sidebar, show_system_status_sidebar
+from api_client import prefetch_service_health, prefetch_models
+from components.sidebar import show_navigation_sidebar, show_system_status_sidebar, show_debug_options
 from pages.dashboard import show_dashboard
 from pages.synthetic_data import show_synthetic_data_lab
 from pages.patient_browser import show_patient_browser
@@ -28,8 +29,15 @@ def main():
     # Sidebar navigation
     page = show_navigation_sidebar()
     
-    # System status in sidebar
-    show_system_status_sidebar()
+    # Start the first health sweep (and, on the first run in this process, the
+    # model list) now; the status lights are rendered into this slot after the
+    # page, so the probes overlap with page data fetches
+    prefetch_service_health()
+    prefetch_models()
+    status_slot = st.sidebar.container()
+    
+    # Debug toggles, rendered once; pages read them from st.session_state["debug_opts"]
+    show_debug_options()
     
     # Route to appropriate page
     if page == "Dashboard":
@@ -40,6 +48,9 @@ def main():
         show_patient_browser()
     elif page == "Models":
         show_model_marketplace()
+    
+    # System status in the reserved sidebar slot (refreshes itself as a fragment)
+    show_system_status_sidebar(status_slot)
 
 
 if __name__ == "__main__":
@@ -3,7 +3,7 @@ Dashboard page for CHARMTwinsights
 """
 
 import streamlit as st
-from api_client import check_service_health, get_available_models
+from api_client import get_available_models, check_service_health_swr, stale_age
 from utils import get_system_stats
 
 
@@ -11,13 +11,11 @@ def show_dashboard():
     """Main dashboard with system overview"""
     st.header("System Overview")
     
-    # Get system metrics
-    health_status = check_service_health()
+    # Get system metrics; the first health sweep was started in the background
+    # at the top of the run, so it overlaps with the models fetch
     models = get_available_models()
-    services_healthy = sum(health_status.values())
-    total_services = len(health_status)
-    
-    stats = get_system_stats(len(models), services_healthy, total_services)
+    health_status = check_service_health_swr()
+    stats = get_system_stats(len(models), health_status)
     
     col1, col2, col3, col4 = st.columns(4)
     
@@ -26,6 +24,9 @@ def show_dashboard():
             label="Models Available",
             value=stats["models_available"]
         )
+        models_age = stale_age("models")
+        if models_age is not None:
+            st.caption(f"⚠ stale ({models_age:.0f}s old)")
     
     with col2:
         st.metric(
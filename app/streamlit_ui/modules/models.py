@@ -3,71 +3,117 @@ Models page for CHARMTwinsights
 """
 
 import streamlit as st
-from api_client import get_available_models, predict_with_model
-from utils import create_model_input_form
+from api_client import (
+    get_available_models, clear_models_cache, predict_with_model,
+    clear_prediction_cache, stale_age
+)
+from typing import Any, Dict, List
+from utils import build_widget_plan, create_model_input_form
+
+
+MODEL_CARD_TEMPLATE = (
+    '<div class="model-card">'
+    '<h3>{title}</h3>'
+    '<p><strong>Image:</strong> {image}</p>'
+    '<p><strong>Description:</strong> {description}</p>'
+    '<p><strong>Authors:</strong> {authors}</p>'
+    '</div>'
+)
+
+PREDICTION_RESULT_HEADER = '<div class="prediction-result"><h4>Prediction Results</h4></div>'
+
+
+@st.cache_data(show_spinner=False)
+def get_widget_plan(example: Dict[str, Any]) -> List[tuple]:
+    """Cached input-widget plan for a model example, so reruns skip the type dispatch"""
+    return build_widget_plan(example)
+
+
+@st.cache_data(show_spinner=False)
+def build_model_cards(models: List[Dict[str, Any]]) -> List[str]:
+    """Render the static HTML card for each model once per catalog"""
+    return [
+        MODEL_CARD_TEMPLATE.format(
+            title=model.get('title', 'Unknown Model'),
+            image=model.get('image', 'N/A'),
+            description=model.get('short_description', 'No description available'),
+            authors=model.get('authors', 'Unknown')
+        )
+        for model in models
+    ]
 
 
 def show_model_marketplace():
     """Model marketplace and testing interface"""
     st.header("Models")
-    st.markdown("Explore and test available models")
+    
+    col1, col2 = st.columns([4, 1])
+    with col1:
+        st.markdown("Explore and test available models")
+    with col2:
+        if st.button("🔄 Refresh", key="refresh_models", use_container_width=True):
+            clear_models_cache()
     
     # Fetch available models
     models = get_available_models()
     
     if models:
         st.success(f"📊 Found {len(models)} available models")
+        models_age = stale_age("models")
+        if models_age is not None:
+            st.caption(f"⚠ Model server unreachable - showing stale list ({models_age:.0f}s old)")
         
-        # Model cards
-        for model in models:
-            with st.container():
-                st.markdown(f"""
-                <div class="model-card">
-                    <h3>{model.get('title', 'Unknown Model')}</h3>
-                    <p><strong>Image:</strong> {model.get('image', 'N/A')}</p>
-                    <p><strong>Description:</strong> {model.get('short_description', 'No description available')}</p>
-                    <p><strong>Authors:</strong> {model.get('authors', 'Unknown')}</p>
-                </div>
-                """, unsafe_allow_html=True)
-                
-                # Model testing section
-                with st.expander(f"Test {model.get('title', 'Model')}"):
-                    if model.get("examples"):
-                        st.subheader("Example Inputs")
-                        
-                        # Show first example
-                        example = model["examples"][0]
-                        
-                        # Create input form based on example
+        # Model cards; each card sits directly above its test expander, so no
+        # per-model wrapper container is needed
+        model_cards = build_model_cards(models)
+        for model, model_card in zip(models, model_cards):
+            st.markdown(model_card, unsafe_allow_html=True)
+            
+            # Model testing section
+            with st.expander(f"Test {model.get('title', 'Model')}"):
+                if model.get("examples"):
+                    st.subheader("Example Inputs")
+                    
+                    # Show first example
+                    example = model["examples"][0]
+                    
+                    # Create input form based on example; editing a field doesn't rerun
+                    # the page, the values are submitted with one of the buttons
+                    with st.form(key=f"form_{model['image']}", border=False):
                         st.markdown("**Modify input parameters:**")
                         
                         # Dynamic input creation
-                        test_input = create_model_input_form(example, model['image'])
+                        test_input = create_model_input_form(get_widget_plan(example), model['image'])
                         
-                        if st.button(f"🚀 Run Prediction", key=f"predict_{model['image']}"):
-                            with st.spinner("Running prediction..."):
-                                result = predict_with_model(model["image"], [test_input])
+                        col1, col2 = st.columns(2)
+                        with col1:
+                            run_clicked = st.form_submit_button("🚀 Run Prediction")
+                        with col2:
+                            rerun_clicked = st.form_submit_button("🔁 Rerun (skip cache)",
+                                                                  help="Identical inputs are cached for 5 minutes")
+                    if rerun_clicked:
+                        clear_prediction_cache()
+                    
+                    if run_clicked or rerun_clicked:
+                        with st.spinner("Running prediction..."):
+                            result = predict_with_model(model["image"], [test_input])
+                            
+                            if result["success"]:
+                                data = result["data"]
+                                
+                                st.markdown(PREDICTION_RESULT_HEADER, unsafe_allow_html=True)
+                                
+                                # Display predictions
+                                if "predictions" in data:
+                                    st.json(data["predictions"])
                                 
-                                if result["success"]:
-                                    data = result["data"]
-                                    
-                                    st.markdown("""
-                                    <div class="prediction-result">
-                                        <h4>Prediction Results</h4>
-                                    </div>
-                                    """, unsafe_allow_html=True)
-                                    
-                                    # Display predictions
-                                    if "predictions" in data:
-                                        st.json(data["predictions"])
-                                    
-                                    # Display logs if available
-                                    if data.get("stderr"):
-                                        with st.expander("📝 Model Logs"):
-                                            st.code(data["stderr"])
-                                else:
-                                    st.error(f"Prediction failed: {result['error']}")
-                    else:
-                        st.info("No examples available for this model")
+                                # Display logs if available
+                                if data.get("stderr"):
+                                    with st.expander("📝 Model Logs"):
+                                        st.code(data["stderr"])
+                            else:
+                                st.error(f"Prediction failed: {result['error']}")
+                else:
+                    st.info("No examples available for this model")
     else:
         st.warning("No models are currently registered")
@@ -2,15 +2,17 @@
 Patient browser page for CHARMTwinsights
 """
 
-import streamlit as st
+import orjson
 import pandas as pd
-from datetime import datetime
+import streamlit as st
+from typing import List
 from api_client import (
-    search_patients, get_patient_details, list_all_synthetic_patients,
+    search_patients, get_patient_details,
     list_all_cohorts, delete_cohort,
-    get_available_cohorts, get_visualization_image, load_resource_data
+    get_available_cohorts, get_visualization_image, load_resource_data, get_patient_stats
 )
-from utils import process_patient_search_results, process_synthetic_patients, process_cohorts_data
+from utils import process_patient_search_results, process_cohorts_data, for_display
+from modules.synthetic_data import load_synthetic_patient_listing, PATIENT_PAGE_SIZES
 
 
 def show_patient_browser():
@@ -18,6 +20,9 @@ def show_patient_browser():
     st.header("Patient Data Browser")
     st.markdown("Explore synthetic patient data with advanced analytics and visualizations")
     
+    # Fetch the cohort dropdown values once for every section on the page
+    available_cohorts = get_available_cohorts()
+    
     # Create tabs for different sections
     tab1, tab2, tab3, tab4, tab5 = st.tabs(["Patients", "Conditions", "Observations", "Procedures", "Cohorts"])
     
@@ -25,16 +30,16 @@ def show_patient_browser():
         show_patients_section()
     
     with tab2:
-        show_conditions_section()
+        show_conditions_section(available_cohorts)
     
     with tab3:
-        show_observations_section()
+        show_observations_section(available_cohorts)
     
     with tab4:
-        show_procedures_section()
+        show_procedures_section(available_cohorts)
     
     with tab5:
-        show_cohorts_section()
+        show_cohorts_section(available_cohorts)
 
 
 def show_patients_section():
@@ -61,39 +66,48 @@ def show_patients_section():
     # Search button and results
     if st.button("Search FHIR Patients", type="primary"):
         birth_date_str = search_date.strftime("%Y-%m-%d") if search_date else None
-        result = search_patients(search_name, search_gender, birth_date_str, count_limit)
+        search = {"result": search_patients(search_name, search_gender, birth_date_str, count_limit), "df": None}
+        data = search["result"].get("data")
+        if search["result"]["success"] and data and "patients" in data and data["patients"]:
+            # Tabulated and summarized once per search; reruns (e.g. picking a
+            # patient below) reuse the table, counts and average as they are
+            df = process_patient_search_results(data["patients"])
+            search["df"] = df
+            search["gender_counts"] = df["Gender"].value_counts()
+            search["avg_age"] = df["Age"].mean()
+            search["options"] = (df["ID"].astype(str) + " - " + df["Name"].astype(str)).tolist()
+        st.session_state.patient_search = search
+    
+    search = st.session_state.get("patient_search")
+    if search is not None:
+        result = search["result"]
         
         if result["success"]:
-            data = result["data"]
-            
-            if data and "patients" in data and data["patients"]:
-                patients_list = data["patients"]
-                st.success(f"Found {len(patients_list)} patients")
+            if search["df"] is not None:
+                df = search["df"]
+                st.success(f"Found {len(df)} patients")
                 
-                # Create patient table with proper field extraction
-                df = process_patient_search_results(patients_list)
-                st.dataframe(df, use_container_width=True)
+                st.dataframe(for_display(df), use_container_width=True)
                 
                 # Summary stats
                 col1, col2, col3 = st.columns(3)
                 with col1:
-                    st.metric("Total Found", len(patients_list))
+                    st.metric("Total Found", len(df))
                 with col2:
-                    gender_counts = df["Gender"].value_counts()
+                    gender_counts = search["gender_counts"]
                     if len(gender_counts) > 0:
                         most_common = gender_counts.index[0]
-                        st.metric("Most Common Gender", f"{most_common} ({gender_counts[most_common]})")
+                        st.metric("Most Common Gender", f"{most_common} ({gender_counts.iloc[0]})")
                 with col3:
-                    avg_age = df[df["Age"] != "N/A"]["Age"].astype(int).mean() if df[df["Age"] != "N/A"].shape[0] > 0 else "N/A"
-                    if avg_age != "N/A":
+                    avg_age = search["avg_age"]
+                    if pd.notna(avg_age):
                         st.metric("Average Age", f"{avg_age:.1f}")
                     else:
                         st.metric("Average Age", "N/A")
                 
                 # Patient details expansion
                 if len(df) > 0:
-                    selected_patient = st.selectbox("Select patient for details", 
-                                                  [f"{row['ID']} - {row['Name']}" for _, row in df.iterrows()])
+                    selected_patient = st.selectbox("Select patient for details", search["options"])
                     if selected_patient:
                         patient_id = selected_patient.split(" - ")[0]
                         show_patient_details(patient_id)
@@ -107,35 +121,55 @@ def show_patients_section():
     st.markdown("### Synthetic Patients Listing")
     st.info("View all synthetic patients generated by Synthea (includes cohort information)")
     
-    if st.button("List All Synthetic Patients"):
-        result = list_all_synthetic_patients()
+    col1, col2, col3 = st.columns([1, 1, 2])
+    with col1:
+        page_size = st.selectbox("Patients per page", PATIENT_PAGE_SIZES, index=1, key="browser_patients_page_size")
+    with col2:
+        page = st.number_input("Page", min_value=1, value=1, step=1, key="browser_patients_page")
+    with col3:
+        list_clicked = st.button("List All Synthetic Patients")
+    offset = (int(page) - 1) * page_size
+    
+    # Only the visible page is fetched; the summary comes from the aggregate stats endpoint.
+    # Render from session state so later reruns don't refetch or rebuild the table;
+    # once listed, changing the page or page size loads just that page
+    listing = st.session_state.get("browser_synthetic_patients")
+    if list_clicked:
+        st.session_state.browser_patient_stats = get_patient_stats()
+    if list_clicked or (listing is not None and (listing["offset"], listing["limit"]) != (offset, page_size)):
+        listing = load_synthetic_patient_listing(offset, page_size)
+        st.session_state.browser_synthetic_patients = listing
+    
+    if listing is not None:
+        result = listing["result"]
         
         if result["success"]:
-            data = result["data"]
-            
-            if data and "patients" in data and len(data["patients"]) > 0:
-                patients_list = data["patients"]
-                st.success(f"Found {len(patients_list)} synthetic patients")
-                
-                # Create patient table
-                df, all_cohorts = process_synthetic_patients(patients_list)
+            if listing["df"] is not None:
+                patients_list = result["data"]["patients"]
+                total_patients = result["data"].get("total_patients", len(patients_list))
+                st.success(f"Found {total_patients} synthetic patients (showing {offset + 1}-{offset + len(patients_list)})")
                 
                 # Display table
-                st.dataframe(df, use_container_width=True)
+                st.dataframe(for_display(listing["df"]), use_container_width=True)
                 
-                # Summary metrics
-                col1, col2, col3 = st.columns(3)
-                with col1:
-                    st.metric("Total Patients", len(patients_list))
-                with col2:
-                    gender_counts = df["Gender"].value_counts()
-                    if len(gender_counts) > 0:
-                        most_common_gender = gender_counts.index[0]
-                        st.metric("Most Common Gender", f"{most_common_gender} ({gender_counts[most_common_gender]})")
-                with col3:
-                    unique_cohorts = len(set(all_cohorts))
-                    st.metric("Number of Cohorts", unique_cohorts)
+                # Summary metrics across all pages
+                stats_result = st.session_state.get("browser_patient_stats")
+                if stats_result and stats_result["success"]:
+                    stats = stats_result["data"]
+                    gender_counts = stats.get("gender_counts", {})
+                    col1, col2, col3 = st.columns(3)
+                    with col1:
+                        st.metric("Total Patients", stats.get("total_patients", total_patients))
+                    with col2:
+                        if gender_counts:
+                            most_common_gender = max(gender_counts, key=gender_counts.get)
+                            st.metric("Most Common Gender",
+                                      f"{str(most_common_gender).title()} ({gender_counts[most_common_gender]})")
+                    with col3:
+                        st.metric("Number of Cohorts", len(stats.get("cohort_counts", {})))
                 
+            elif result["data"] and result["data"].get("total_patients", 0) > 0:
+                st.info(f"No patients on page {int(page)}. There are {result['data']['total_patients']} patients in total.")
             else:
                 st.info("No synthetic patients found")
         else:
@@ -146,131 +180,138 @@ def show_patient_details(patient_id):
     """Show detailed information for a specific patient"""
     st.subheader(f"Patient Details: {patient_id}")
     
-    result = get_patient_details(patient_id)
+    # Only displayed, so skip decoding and hand the JSON text straight to st.json
+    result = get_patient_details(patient_id, as_text=True)
     if result["success"]:
         st.json(result["data"])
     else:
         st.error(f"Failed to fetch patient details: {result['error']}")
 
 
-def show_conditions_section():
+def show_conditions_section(available_cohorts: List[str]):
     """Conditions analysis and visualization"""
     st.subheader("Conditions Analysis")
     
-    # Controls
-    col1, col2 = st.columns(2)
-    with col1:
-        limit = st.slider("Number of conditions to show", 5, 50, 20, key="conditions_limit")
-    with col2:
-        available_cohorts = get_available_cohorts()
-        cohort_filter = st.selectbox("Filter by Cohort (optional)", 
-                                   ["All"] + available_cohorts, 
-                                   key="conditions_cohort")
-        cohort_filter = cohort_filter if cohort_filter != "All" else None
-    
-    # Analysis tabs
-    tab1, tab2, tab3, tab4 = st.tabs(["Overview", "By Gender", "By Age", "Data"])
-    
-    with tab1:
-        st.markdown("**Most Common Conditions**")
-        if st.button("Generate Conditions Visualization", key="viz_conditions"):
-            show_visualization_image("/stats/visualize-conditions", limit, cohort_filter)
-    
-    with tab2:
-        st.markdown("**Conditions by Gender**")
-        if st.button("Generate Gender Breakdown", key="viz_conditions_gender"):
-            show_visualization_image("/stats/visualize-conditions-by-gender", limit, cohort_filter)
-    
-    with tab3:
-        st.markdown("**Conditions by Age Groups**")
-        bracket_size = st.slider("Age bracket size (years)", 5, 20, 10, key="conditions_age_bracket")
-        if st.button("Generate Age Breakdown", key="viz_conditions_age"):
-            show_visualization_image("/stats/visualize-conditions-by-age", limit, cohort_filter, bracket_size)
-    
-    with tab4:
-        if st.button("Load Conditions Data", key="load_conditions_data"):
-            load_conditions_data()
+    # Controls and actions share a form, so dragging a slider doesn't rerun
+    # the page; values are only applied when one of the buttons is pressed
+    with st.form("conditions_form", border=False):
+        # Controls
+        col1, col2 = st.columns(2)
+        with col1:
+            limit = st.slider("Number of conditions to show", 5, 50, 20, key="conditions_limit")
+        with col2:
+            cohort_filter = st.selectbox("Filter by Cohort (optional)", 
+                                       ["All"] + available_cohorts, 
+                                       key="conditions_cohort")
+            cohort_filter = cohort_filter if cohort_filter != "All" else None
+        
+        # Analysis tabs
+        tab1, tab2, tab3, tab4 = st.tabs(["Overview", "By Gender", "By Age", "Data"])
+        
+        with tab1:
+            st.markdown("**Most Common Conditions**")
+            if st.form_submit_button("Generate Conditions Visualization"):
+                show_visualization_image("/stats/visualize-conditions", limit, cohort_filter)
+        
+        with tab2:
+            st.markdown("**Conditions by Gender**")
+            if st.form_submit_button("Generate Gender Breakdown"):
+                show_visualization_image("/stats/visualize-conditions-by-gender", limit, cohort_filter)
+        
+        with tab3:
+            st.markdown("**Conditions by Age Groups**")
+            bracket_size = st.slider("Age bracket size (years)", 5, 20, 10, key="conditions_age_bracket")
+            if st.form_submit_button("Generate Age Breakdown"):
+                show_visualization_image("/stats/visualize-conditions-by-age", limit, cohort_filter, bracket_size)
+        
+        with tab4:
+            if st.form_submit_button("Load Conditions Data"):
+                load_conditions_data()
 
 
-def show_observations_section():
+def show_observations_section(available_cohorts: List[str]):
     """Observations analysis and visualization"""
     st.subheader("Observations Analysis")
     
-    # Controls
-    col1, col2 = st.columns(2)
-    with col1:
-        limit = st.slider("Number of observations to show", 5, 50, 20, key="observations_limit")
-    with col2:
-        available_cohorts = get_available_cohorts()
-        cohort_filter = st.selectbox("Filter by Cohort (optional)", 
-                                   ["All"] + available_cohorts, 
-                                   key="observations_cohort")
-        cohort_filter = cohort_filter if cohort_filter != "All" else None
-    
-    # Analysis tabs
-    tab1, tab2, tab3, tab4 = st.tabs(["Overview", "By Gender", "By Age", "Data"])
-    
-    with tab1:
-        st.markdown("**Most Common Observations**")
-        if st.button("Generate Observations Visualization", key="viz_observations"):
-            show_visualization_image("/stats/visualize-observations", limit, cohort_filter)
-    
-    with tab2:
-        st.markdown("**Observations by Gender**")
-        if st.button("Generate Gender Breakdown", key="viz_observations_gender"):
-            show_visualization_image("/stats/visualize-observations-by-gender", limit, cohort_filter)
-    
-    with tab3:
-        st.markdown("**Observations by Age Groups**")
-        bracket_size = st.slider("Age bracket size (years)", 5, 20, 5, key="observations_age_bracket")
-        if st.button("Generate Age Breakdown", key="viz_observations_age"):
-            show_visualization_image("/stats/visualize-observations-by-age", limit, cohort_filter, bracket_size)
-    
-    with tab4:
-        if st.button("Load Observations Data", key="load_observations_data"):
-            load_observations_data()
+    # Controls and actions share a form, so dragging a slider doesn't rerun
+    # the page; values are only applied when one of the buttons is pressed
+    with st.form("observations_form", border=False):
+        # Controls
+        col1, col2 = st.columns(2)
+        with col1:
+            limit = st.slider("Number of observations to show", 5, 50, 20, key="observations_limit")
+        with col2:
+            cohort_filter = st.selectbox("Filter by Cohort (optional)", 
+                                       ["All"] + available_cohorts, 
+                                       key="observations_cohort")
+            cohort_filter = cohort_filter if cohort_filter != "All" else None
+        
+        # Analysis tabs
+        tab1, tab2, tab3, tab4 = st.tabs(["Overview", "By Gender", "By Age", "Data"])
+        
+        with tab1:
+            st.markdown("**Most Common Observations**")
+            if st.form_submit_button("Generate Observations Visualization"):
+                show_visualization_image("/stats/visualize-observations", limit, cohort_filter)
+        
+        with tab2:
+            st.markdown("**Observations by Gender**")
+            if st.form_submit_button("Generate Gender Breakdown"):
+                show_visualization_image("/stats/visualize-observations-by-gender", limit, cohort_filter)
+        
+        with tab3:
+            st.markdown("**Observations by Age Groups**")
+            bracket_size = st.slider("Age bracket size (years)", 5, 20, 5, key="observations_age_bracket")
+            if st.form_submit_button("Generate Age Breakdown"):
+                show_visualization_image("/stats/visualize-observations-by-age", limit, cohort_filter, bracket_size)
+        
+        with tab4:
+            if st.form_submit_button("Load Observations Data"):
+                load_observations_data()
 
 
-def show_procedures_section():
+def show_procedures_section(available_cohorts: List[str]):
     """Procedures analysis and visualization"""
     st.subheader("Procedures Analysis")
     
-    # Controls
-    col1, col2 = st.columns(2)
-    with col1:
-        limit = st.slider("Number of procedures to show", 5, 50, 20, key="procedures_limit")
-    with col2:
-        available_cohorts = get_available_cohorts()
-        cohort_filter = st.selectbox("Filter by Cohort (optional)", 
-                                   ["All"] + available_cohorts, 
-                                   key="procedures_cohort")
-        cohort_filter = cohort_filter if cohort_filter != "All" else None
-    
-    # Analysis tabs
-    tab1, tab2, tab3, tab4 = st.tabs(["Overview", "By Gender", "By Age", "Data"])
-    
-    with tab1:
-        st.markdown("**Most Common Procedures**")
-        if st.button("Generate Procedures Visualization", key="viz_procedures"):
-            show_visualization_image("/stats/visualize-procedures", limit, cohort_filter)
-    
-    with tab2:
-        st.markdown("**Procedures by Gender**")
-        if st.button("Generate Gender Breakdown", key="viz_procedures_gender"):
-            show_visualization_image("/stats/visualize-procedures-by-gender", limit, cohort_filter)
-    
-    with tab3:
-        st.markdown("**Procedures by Age Groups**")
-        bracket_size = st.slider("Age bracket size (years)", 5, 20, 10, key="procedures_age_bracket")
-        if st.button("Generate Age Breakdown", key="viz_procedures_age"):
-            show_visualization_image("/stats/visualize-procedures-by-age", limit, cohort_filter, bracket_size)
-    
-    with tab4:
-        if st.button("Load Procedures Data", key="load_procedures_data"):
-            load_procedures_data()
+    # Controls and actions share a form, so dragging a slider doesn't rerun
+    # the page; values are only applied when one of the buttons is pressed
+    with st.form("procedures_form", border=False):
+        # Controls
+        col1, col2 = st.columns(2)
+        with col1:
+            limit = st.slider("Number of procedures to show", 5, 50, 20, key="procedures_limit")
+        with col2:
+            cohort_filter = st.selectbox("Filter by Cohort (optional)", 
+                                       ["All"] + available_cohorts, 
+                                       key="procedures_cohort")
+            cohort_filter = cohort_filter if cohort_filter != "All" else None
+        
+        # Analysis tabs
+        tab1, tab2, tab3, tab4 = st.tabs(["Overview", "By Gender", "By Age", "Data"])
+        
+        with tab1:
+            st.markdown("**Most Common Procedures**")
+            if st.form_submit_button("Generate Procedures Visualization"):
+                show_visualization_image("/stats/visualize-procedures", limit, cohort_filter)
+        
+        with tab2:
+            st.markdown("**Procedures by Gender**")
+            if st.form_submit_button("Generate Gender Breakdown"):
+                show_visualization_image("/stats/visualize-procedures-by-gender", limit, cohort_filter)
+        
+        with tab3:
+            st.markdown("**Procedures by Age Groups**")
+            bracket_size = st.slider("Age bracket size (years)", 5, 20, 10, key="procedures_age_bracket")
+            if st.form_submit_button("Generate Age Breakdown"):
+                show_visualization_image("/stats/visualize-procedures-by-age", limit, cohort_filter, bracket_size)
+        
+        with tab4:
+            if st.form_submit_button("Load Procedures Data"):
+                load_procedures_data()
 
 
-def show_cohorts_section():
+def show_cohorts_section(available_cohorts: List[str]):
     """Cohort management and overview"""
     st.subheader("Cohort Management")
     
@@ -304,8 +345,8 @@ def show_cohorts_section():
                         largest_cohort = df.iloc[largest_idx]
                         st.metric("Largest Cohort", f"{largest_cohort['Cohort ID']} ({largest_cohort['Patient Count']})")
                 
-                # Show raw data if needed
-                if st.checkbox("Show Raw JSON", key="show_raw_cohorts"):
+                # Show raw data if enabled in the sidebar
+                if st.session_state.get("debug_opts", {}).get("raw", False):
                     with st.expander("Raw Response"):
                         st.json(data)
             else:
@@ -317,7 +358,6 @@ def show_cohorts_section():
     
     # Cohort management
     st.markdown("**Cohort Management**")
-    available_cohorts = get_available_cohorts()
     if available_cohorts:
         cohort_id_delete = st.selectbox("Select cohort to delete", 
                                       [""] + available_cohorts, 
@@ -344,13 +384,11 @@ def show_visualization_image(endpoint, limit, cohort_filter=None, bracket_size=N
         content_type = result["content_type"]
         
         if 'image' in content_type:
-            # It's an image, display it directly
             st.image(result["content"], use_container_width=True)
         elif 'json' in content_type:
             # It's JSON, probably an error message
             try:
-                import json
-                error_data = json.loads(result["content"])
+                error_data = orjson.loads(result["content"])
                 st.error(f"Visualization failed: {error_data}")
             except:
                 content_str = result["content"].decode('utf-8') if isinstance(result["content"], bytes) else str(result["content"])
@@ -364,7 +402,7 @@ def show_visualization_image(endpoint, limit, cohort_filter=None, bracket_size=N
     else:
         st.error(f"Failed to generate visualization: {result['error']}")
         # Add debug info
-        if st.sidebar.checkbox("Show Debug Info", key="debug_viz"):
+        if st.session_state.get("debug_opts", {}).get("debug", False):
             st.text(result["error"])
 
 
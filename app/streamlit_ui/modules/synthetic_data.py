@@ -5,29 +5,63 @@ Enhanced with async job management, state/city selection, and real-time monitori
 
 import streamlit as st
 import pandas as pd
-import time
+from collections import OrderedDict
 from datetime import datetime
+from functools import lru_cache
+from typing import List, Optional, Tuple
 from api_client import (
-    generate_synthetic_patients, list_all_synthetic_patients, 
-    get_job_status, list_all_jobs, cancel_job,
-    get_available_states, get_cities_for_state
+    generate_synthetic_patients, list_all_synthetic_patients, get_patient_stats, clear_data_caches,
+    get_job_status, get_jobs_bulk, list_all_jobs, cancel_job,
+    get_available_states
 )
-from utils import process_synthetic_patients
+from utils import process_synthetic_patients, for_display
+
+
+PATIENT_PAGE_SIZES = [50, 100, 250, 500]
+JOB_REFRESH_SECONDS = 5
+MAX_TRACKED_JOBS = 50
+TERMINAL_JOB_STATUSES = ("completed", "failed", "cancelled")
+# Job card request details, one column each: generation settings, then demographics
+REQUEST_DETAIL_FIELDS = (
+    ("num_patients", "num_years", "cohort_id", "exporter"),
+    ("min_age", "max_age", "gender", "state", "city"),
+)
+
+
+def track_job(job_id: str):
+    """Add a job to this session's Job Monitor list (no duplicates; only the most recent jobs are kept)"""
+    active_jobs = st.session_state.setdefault("active_jobs", OrderedDict())
+    active_jobs.pop(job_id, None)
+    active_jobs[job_id] = None
+    while len(active_jobs) > MAX_TRACKED_JOBS:
+        dropped_id, _ = active_jobs.popitem(last=False)
+        st.session_state.get("terminal_jobs", {}).pop(dropped_id, None)
+
+
+@lru_cache(maxsize=1024)
+def parse_timestamp(value: str) -> datetime:
+    """Parse an ISO-8601 job timestamp; memoized since job cards re-render the same ones on every refresh"""
+    # Python 3.11+ fromisoformat accepts a trailing "Z" directly
+    return datetime.fromisoformat(value)
+
+
+ALL_STATES_OPTION = "All States (Population Sampling)"
+# Common states offered when the server's state list can't be loaded
+FALLBACK_STATE_OPTIONS = (ALL_STATES_OPTION, "California", "Texas", "Florida", "New York", "Pennsylvania",
+                          "Illinois", "Ohio", "Georgia", "North Carolina", "Michigan")
 
 
 @st.cache_data(ttl=3600)  # Cache for 1 hour - states rarely change
 def load_available_states():
-    """Load available states with long-term caching"""
+    """Load the state selectbox options (population sampling first) with long-term caching"""
     try:
         states_result = get_available_states()
         if states_result["success"]:
-            return states_result["data"].get("states", []), None
+            return (ALL_STATES_OPTION,) + tuple(states_result["data"].get("states", [])), None
         else:
-            return [], f"Could not load states from server: {states_result['error']}"
+            return FALLBACK_STATE_OPTIONS, f"Could not load states from server: {states_result['error']}"
     except Exception as e:
-        return [], f"Connection error loading states: {str(e)}"
-
-
+        return FALLBACK_STATE_OPTIONS, f"Connection error loading states: {str(e)}"
 
 
 def show_synthetic_data_lab():
@@ -35,19 +69,22 @@ def show_synthetic_data_lab():
     st.header("🧬 Synthetic Data Generation")
     st.markdown("Generate synthetic patient cohorts with geographic and demographic controls")
     
-    # Create tabs for different sections
-    tab1, tab2, tab3 = st.tabs(["🚀 Generate Data", "📊 Job Monitor", "👥 Existing Patients"])
+    # Section switcher; unlike st.tabs, only the selected section's code runs
+    # (hidden tabs would still fetch job statuses and listing pages on every rerun)
+    section = st.radio("Section", ["🚀 Generate Data", "📊 Job Monitor", "👥 Existing Patients"],
+                       horizontal=True, key="synthetic_data_section", label_visibility="collapsed")
     
-    with tab1:
+    if section == "🚀 Generate Data":
         show_generation_interface()
-    
-    with tab2:
+    elif section == "📊 Job Monitor":
         show_job_monitor()
-    
-    with tab3:
+    elif section == "👥 Existing Patients":
         show_existing_patients()
 
 
+# The generation form and the patient listing are fragments: their widgets rerun
+# only their own section, not the page header and section switcher around it
+@st.fragment
 def show_generation_interface():
     """Show the patient generation interface"""
     st.subheader("Cohort Configuration")
@@ -77,22 +114,19 @@ def show_generation_interface():
     st.markdown("---")
     st.subheader("🌍 Geographic Distribution")
     
-    # Load available states with caching
-    available_states, states_error = load_available_states()
+    # Load available states with caching (falls back to a fixed list of common states)
+    state_options, states_error = load_available_states()
     if states_error:
         st.warning(states_error)
         st.info("💡 Using fallback state list. Some features may be limited.")
-        # Add some common states as fallback
-        available_states = ["California", "Texas", "Florida", "New York", "Pennsylvania", "Illinois", "Ohio", "Georgia", "North Carolina", "Michigan"]
     
     col1, col2, col3 = st.columns(3)
     
     with col1:
         # State selection
-        state_options = ["All States (Population Sampling)"] + available_states
         selected_state_option = st.selectbox("State", state_options)
         
-        if selected_state_option == "All States (Population Sampling)":
+        if selected_state_option == ALL_STATES_OPTION:
             selected_state = None
             use_population_sampling = True
         else:
@@ -161,18 +195,60 @@ def show_generation_interface():
                 with col2:
                     st.metric("Status", job_data["status"].title())
                 with col3:
-                    created_time = datetime.fromisoformat(job_data["created_at"].replace('Z', '+00:00'))
+                    created_time = parse_timestamp(job_data["created_at"])
                     st.metric("Created", created_time.strftime("%H:%M:%S"))
                 
                 # Store job ID in session state for monitoring
-                if "active_jobs" not in st.session_state:
-                    st.session_state.active_jobs = []
-                st.session_state.active_jobs.append(job_data["job_id"])
-                
-                st.info(f"📊 Monitor progress in the **Job Monitor** tab")
-                
+                track_job(job_data["job_id"])
+                st.session_state.jobs_in_progress = True
+                st.session_state.followed_job = {"job_id": job_data["job_id"], "finished": False}
+
             else:
                 st.error(f"❌ Job creation failed: {result['error']}")
+                return
+    
+    # Progress of the last started job is polled in its own fragment on a timer, so the
+    # script thread is free between refreshes; the timer is dropped once the job finishes
+    followed = st.session_state.get("followed_job")
+    if followed:
+        st.fragment(run_every=None if followed["finished"] else JOB_REFRESH_SECONDS)(show_followed_job)()
+
+
+def show_followed_job():
+    """Show progress for the most recently started generation job"""
+    followed = st.session_state.followed_job
+    job_id = followed["job_id"]
+    result = get_job_status(job_id)
+    if not result["success"]:
+        st.warning(f"Could not fetch progress for job {job_id[:8]}...: {result['error']}")
+        st.info("📊 The job keeps running; monitor it in the **Job Monitor** section")
+        return
+    
+    job = result["data"]
+    if job["status"] not in TERMINAL_JOB_STATUSES:
+        with st.status("Generating patients...", expanded=True):
+            st.progress(min(float(job.get("progress") or 0.0), 1.0))
+            remaining = job.get("estimated_remaining_seconds")
+            eta = f" (about {int(remaining)}s remaining)" if remaining else ""
+            st.caption(f"{job.get('current_phase', 'Processing...')}{eta}")
+        return
+    
+    if job["status"] == "completed":
+        st.status("✅ Generation complete", state="complete", expanded=False)
+    else:
+        with st.status(f"Job {job['status']}", state="error"):
+            if job.get("error"):
+                st.error(job["error"])
+    
+    if not followed["finished"]:
+        followed["finished"] = True
+        if job_id in st.session_state.get("active_jobs", {}):
+            st.session_state.setdefault("terminal_jobs", {})[job_id] = job
+        if job["status"] == "completed":
+            # New patients and cohorts are on the server now
+            clear_data_caches()
+        # run_every is fixed when the fragment is declared, so rerun the page to drop the timer
+        st.rerun()
 
 
 def show_job_monitor():
@@ -180,20 +256,34 @@ def show_job_monitor():
     st.subheader("📊 Active Jobs")
     
     # Auto-refresh controls
-    col1, col2, col3 = st.columns([2, 1, 1])
+    col1, col2 = st.columns([3, 1])
     with col1:
-        auto_refresh = st.checkbox("🔄 Auto-refresh (5s)", value=False)
+        auto_refresh = st.checkbox(f"🔄 Auto-refresh ({JOB_REFRESH_SECONDS}s)", value=False, key="auto_refresh_jobs")
     with col2:
-        if st.button("🔄 Refresh Now"):
-            st.rerun()
-    with col3:
         if st.button("📜 Show All Jobs"):
             st.session_state.show_all_jobs = True
     
-    # Auto-refresh logic
-    if auto_refresh:
-        time.sleep(5)
+    # Only the job list reruns on the timer (and on Refresh Now / cancel), not the rest of the page.
+    # The timer is only armed while some job may still change; it needs no sleeping script thread.
+    ticking = auto_refresh and st.session_state.get("jobs_in_progress", True)
+    st.fragment(run_every=JOB_REFRESH_SECONDS if ticking else None)(show_job_list)()
+    if auto_refresh and not ticking:
+        st.caption("Auto-refresh paused: no queued or running jobs")
+
+
+def _track_jobs_in_progress(in_progress: bool):
+    """Record whether any listed job is still queued or running, (dis)arming the refresh timer when that changes"""
+    was_in_progress = st.session_state.get("jobs_in_progress", True)
+    st.session_state.jobs_in_progress = in_progress
+    if in_progress != was_in_progress and st.session_state.get("auto_refresh_jobs"):
+        # run_every is fixed when the fragment is declared, so rerun the page to re-declare it
         st.rerun()
+
+
+def show_job_list():
+    """Show status cards for the tracked (or all) generation jobs"""
+    # Clicking reruns just this fragment, which refetches the statuses
+    st.button("🔄 Refresh Now", key="refresh_jobs")
     
     # Get jobs to display with error handling
     jobs = []
@@ -208,20 +298,30 @@ def show_job_monitor():
                 error_message = f"Failed to fetch all jobs: {jobs_result['error']}"
         else:
             # Show only active jobs from session state
-            active_job_ids = st.session_state.get("active_jobs", [])
+            active_job_ids = list(st.session_state.get("active_jobs", {}))
             if not active_job_ids:
+                _track_jobs_in_progress(False)
                 st.info("No active jobs. Generate some patients to see jobs here!")
                 return
             
-            for job_id in active_job_ids:
-                try:
-                    job_result = get_job_status(job_id)
-                    if job_result["success"]:
-                        jobs.append(job_result["data"])
-                    else:
+            # Finished jobs no longer change, so they are served from session state;
+            # one request covers every job that may still be progressing
+            terminal_jobs = st.session_state.setdefault("terminal_jobs", {})
+            fetched = {}
+            pending_ids = [job_id for job_id in active_job_ids if job_id not in terminal_jobs]
+            if pending_ids:
+                jobs_result = get_jobs_bulk(pending_ids)
+                if jobs_result["success"]:
+                    for job in jobs_result["data"]["jobs"]:
+                        fetched[job["job_id"]] = job
+                        if job["status"] in TERMINAL_JOB_STATUSES:
+                            terminal_jobs[job["job_id"]] = job
+                    for job_id in jobs_result["data"]["not_found"]:
                         st.warning(f"Could not fetch status for job {job_id[:8]}...")
-                except Exception as e:
-                    st.warning(f"Error fetching job {job_id[:8]}...: {str(e)}")
+                else:
+                    error_message = f"Failed to fetch job statuses: {jobs_result['error']}"
+            jobs = [terminal_jobs.get(job_id) or fetched[job_id] for job_id in active_job_ids
+                    if job_id in terminal_jobs or job_id in fetched]
     
     except Exception as e:
         error_message = f"Connection error: {str(e)}"
@@ -231,6 +331,8 @@ def show_job_monitor():
         st.info("💡 Try refreshing the page or check if the services are running")
         return
     
+    _track_jobs_in_progress(any(job["status"] in ["queued", "running"] for job in jobs))
+    
     if not jobs:
         st.info("No jobs found.")
         return
@@ -268,7 +370,7 @@ def show_job_card(job):
         with col2:
             st.markdown(f"**Status:** {status.title()}")
         with col3:
-            created = datetime.fromisoformat(job["created_at"].replace('Z', '+00:00'))
+            created = parse_timestamp(job["created_at"])
             st.markdown(f"**Created:** {created.strftime('%H:%M:%S')}")
         with col4:
             if status in ["queued", "running"]:
@@ -276,7 +378,7 @@ def show_job_card(job):
                     cancel_result = cancel_job(job_id)
                     if cancel_result["success"]:
                         st.success("Job cancelled")
-                        st.rerun()
+                        st.rerun(scope="fragment")
                     else:
                         st.error(f"Cancel failed: {cancel_result['error']}")
         
@@ -307,9 +409,8 @@ def show_job_card(job):
                 if "total_patients" in job:
                     st.metric("Patients Generated", job["total_patients"])
             with col2:
-                if "completed_at" in job:
-                    completed = datetime.fromisoformat(job["completed_at"].replace('Z', '+00:00'))
-                    duration = completed - datetime.fromisoformat(job["created_at"].replace('Z', '+00:00'))
+                if job.get("completed_at"):
+                    duration = parse_timestamp(job["completed_at"]) - parse_timestamp(job["created_at"])
                     st.metric("Duration", f"{duration.total_seconds():.0f}s")
             with col3:
                 cohort_id = job.get("request_data", {}).get("cohort_id", "N/A")
@@ -320,88 +421,155 @@ def show_job_card(job):
             if "error" in job:
                 st.error(f"Error: {job['error']}")
         
-        # Request parameters (collapsible)
-        with st.expander(f"📋 Request Details - {job_id[:8]}"):
+        # Request parameters, built only when shown: an expander would still
+        # serialize both JSON blocks for every card on every refresh
+        if st.checkbox(f"📋 Request Details - {job_id[:8]}", key=f"details_{job_id}"):
             request_data = job.get("request_data", {})
             if request_data:
                 col1, col2 = st.columns(2)
                 with col1:
-                    st.json({k: v for k, v in request_data.items() if k in 
-                            ["num_patients", "num_years", "cohort_id", "exporter"]})
+                    st.json({k: request_data[k] for k in REQUEST_DETAIL_FIELDS[0] if k in request_data})
                 with col2:
-                    st.json({k: v for k, v in request_data.items() if k in 
-                            ["min_age", "max_age", "gender", "state", "city"]})
+                    st.json({k: request_data[k] for k in REQUEST_DETAIL_FIELDS[1] if k in request_data})
         
         st.markdown("---")
 
 
+def _synthetic_patient_table(offset: int, limit: Optional[int]) -> Tuple[dict, Optional[pd.DataFrame], pd.Series]:
+    """Fetch and tabulate one listing page; an unchanged page reuses its table via its ETag"""
+    result = list_all_synthetic_patients(offset, limit)
+    if not result["success"]:
+        raise RuntimeError(result["error"])
+    data = result["data"]
+    if data and "patients" in data and len(data["patients"]) > 0:
+        df, cohort_counts = _tabulate_patients(result["etag"], data["patients"])
+        return data, df, cohort_counts
+    return data, None, pd.Series(dtype="int64")
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def _tabulate_patients(etag: str, _patients: List[dict]) -> Tuple[pd.DataFrame, pd.Series]:
+    """Build the listing table once per ETag; an unchanged page keeps its DataFrame past the minute's cache.
+
+    The patient list is keyed by its ETag only (the leading underscore keeps Streamlit from hashing it).
+    """
+    return process_synthetic_patients(_patients)
+
+
+def load_synthetic_patient_listing(offset: int = 0, limit: Optional[int] = None) -> dict:
+    """Fetch a page of the synthetic patient listing along with its summary DataFrame"""
+    listing = {"result": None, "df": None, "cohort_counts": None, "offset": offset, "limit": limit}
+    try:
+        data, listing["df"], listing["cohort_counts"] = _synthetic_patient_table(offset, limit)
+        listing["result"] = {"success": True, "data": data}
+    except Exception as e:
+        listing["result"] = {"success": False, "error": str(e)}
+    return listing
+
+
+@st.fragment
 def show_existing_patients():
-    """Show existing synthetic patients"""
+    """Show existing synthetic patients, one page at a time"""
     st.subheader("👥 Existing Synthetic Patients")
     
-    if st.button("🔍 List Patients"):
-        result = list_all_synthetic_patients()
+    col1, col2, col3, col4 = st.columns([1, 1, 1, 1])
+    with col1:
+        page_size = st.selectbox("Patients per page", PATIENT_PAGE_SIZES, index=1, key="existing_patients_page_size")
+    with col2:
+        page = st.number_input("Page", min_value=1, value=1, step=1, key="existing_patients_page")
+    with col3:
+        list_clicked = st.button("🔍 List Patients")
+    with col4:
+        refresh_clicked = st.button("🔄 Refresh", help="Refetch from the server instead of the last minute's cache")
+    offset = (int(page) - 1) * page_size
+    
+    # Listing pages and stats are cached for a minute; Refresh drops them first
+    if refresh_clicked:
+        clear_data_caches()
+        list_clicked = True
+    
+    # Render from session state so later reruns don't refetch or rebuild the table;
+    # once listed, changing the page or page size loads just that page
+    listing = st.session_state.get("existing_patients")
+    if list_clicked:
+        st.session_state.existing_patient_stats = get_patient_stats()
+    if list_clicked or (listing is not None and (listing["offset"], listing["limit"]) != (offset, page_size)):
+        listing = load_synthetic_patient_listing(offset, page_size)
+        st.session_state.existing_patients = listing
+    if listing is None:
+        return
+    
+    result = listing["result"]
+    if result["success"]:
+        data = result["data"]
         
-        if result["success"]:
-            data = result["data"]
+        if listing["df"] is not None:
+            patients_list = data["patients"]
+            total_patients = data.get("total_patients", len(patients_list))
+            st.success(f"Found {total_patients} patients (showing {offset + 1}-{offset + len(patients_list)})")
             
-            if data and "patients" in data and len(data["patients"]) > 0:
-                patients_list = data["patients"]
-                st.success(f"Found {len(patients_list)} patients")
-                
-                # Create a summary table
-                df, all_cohorts = process_synthetic_patients(patients_list)
-                
-                # Display the table
-                st.dataframe(df, use_container_width=True)
-                
-                # Show statistics
-                col1, col2, col3, col4 = st.columns(4)
-                
-                with col1:
-                    st.metric("Total Patients", len(patients_list))
-                
-                with col2:
-                    gender_counts = df["Gender"].value_counts()
-                    if len(gender_counts) > 0:
-                        most_common_gender = gender_counts.index[0]
-                        st.metric("Most Common Gender", f"{most_common_gender} ({gender_counts[most_common_gender]})")
-                
-                with col3:
-                    unique_cohorts = len(set(all_cohorts))
-                    st.metric("Number of Cohorts", unique_cohorts)
-                
-                with col4:
-                    # Calculate average age
-                    ages = [int(age) for age in df["Age"] if age != "N/A" and age.isdigit()]
-                    if ages:
-                        avg_age = sum(ages) / len(ages)
-                        st.metric("Average Age", f"{avg_age:.1f}")
-                
-                # Show cohort distribution
-                if all_cohorts:
-                    st.subheader("📊 Cohort Distribution")
-                    cohort_counts = pd.Series(all_cohorts).value_counts()
-                    st.bar_chart(cohort_counts)
-                
-                # Show gender distribution
-                st.subheader("👥 Gender Distribution")
-                gender_counts = df["Gender"].value_counts()
-                st.bar_chart(gender_counts)
-                
-                # Show raw data for debugging if enabled
-                if st.sidebar.checkbox("Show Raw Patient Data", key="show_raw_patients"):
-                    with st.expander("🔍 Raw Response Data"):
-                        st.json(data)
-                        
-            elif data and "patients" in data:
-                st.info("No patients found. Generate some synthetic data first!")
-            else:
-                st.warning("Unexpected response format from server")
-                with st.expander("🔍 Raw Response"):
+            # Display the current page
+            st.dataframe(for_display(listing["df"]), use_container_width=True)
+            
+            # Statistics come from the aggregate endpoint so they cover every page
+            show_patient_statistics(st.session_state.get("existing_patient_stats"))
+            
+            # Show raw data for debugging if enabled
+            if st.session_state.get("debug_opts", {}).get("raw", False):
+                with st.expander("🔍 Raw Response Data"):
                     st.json(data)
+                    
+        elif data and "patients" in data:
+            if data.get("total_patients", 0) > 0:
+                st.info(f"No patients on page {int(page)}. There are {data['total_patients']} patients in total.")
+            else:
+                st.info("No patients found. Generate some synthetic data first!")
         else:
-            st.error(f"Failed to fetch patients: {result['error']}")
-            # Add debug info if enabled
-            if st.sidebar.checkbox("Show Debug Info", key="debug_patients"):
-                st.text(result["error"])
\ No newline at end of file
+            st.warning("Unexpected response format from server")
+            with st.expander("🔍 Raw Response"):
+                st.json(data)
+    else:
+        st.error(f"Failed to fetch patients: {result['error']}")
+        # Add debug info if enabled
+        if st.session_state.get("debug_opts", {}).get("debug", False):
+            st.text(result["error"])
+
+
+def show_patient_statistics(stats_result: Optional[dict]):
+    """Show summary metrics and distributions across all synthetic patients"""
+    if not stats_result or not stats_result["success"]:
+        error = stats_result["error"] if stats_result else "not loaded"
+        st.warning(f"Could not load patient statistics: {error}")
+        return
+    
+    stats = stats_result["data"]
+    gender_counts = (pd.Series(stats.get("gender_counts", {}), dtype="int64")
+                     .sort_values(ascending=False)
+                     .rename(index=lambda gender: str(gender).title()))
+    cohort_counts = pd.Series(stats.get("cohort_counts", {}), dtype="int64").sort_values(ascending=False)
+    
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        st.metric("Total Patients", stats.get("total_patients", 0))
+    
+    with col2:
+        if len(gender_counts) > 0:
+            most_common_gender = gender_counts.index[0]
+            st.metric("Most Common Gender", f"{most_common_gender} ({gender_counts.iloc[0]})")
+    
+    with col3:
+        st.metric("Number of Cohorts", len(cohort_counts))
+    
+    with col4:
+        if stats.get("average_age") is not None:
+            st.metric("Average Age", f"{stats['average_age']:.1f}")
+    
+    # Show cohort distribution
+    if len(cohort_counts) > 0:
+        st.subheader("📊 Cohort Distribution")
+        st.bar_chart(cohort_counts)
+    
+    # Show gender distribution
+    st.subheader("👥 Gender Distribution")
+    st.bar_chart(gender_counts)
@@ -3,25 +3,26 @@ Utility functions for CHARMTwinsights Streamlit app
 """
 
 import pandas as pd
-from datetime import datetime
-from typing import Dict, List, Any, Optional
+from itertools import chain
+from typing import Dict, List, Any, Tuple
 
 
-def calculate_age(birth_date_str: str) -> str:
-    """Calculate age from birth date string"""
-    try:
-        birth_dt = datetime.strptime(birth_date_str, "%Y-%m-%d")
-        today = datetime.now()
-        age = today.year - birth_dt.year - ((today.month, today.day) < (birth_dt.month, birth_dt.day))
-        return str(age)
-    except Exception:
-        return "N/A"
+def calculate_ages(birth_dates: pd.Series) -> pd.Series:
+    """Vectorized age calculation for a Series of YYYY-MM-DD birth date strings.
 
+    Unparseable or missing dates yield <NA> in the returned nullable Int64 Series.
+    """
+    birth_dt = pd.to_datetime(birth_dates, format="%Y-%m-%d", errors="coerce")
+    today = pd.Timestamp.today()
+    # Compare month/day as one MMDD key: one vectorized comparison instead of three
+    birthday_key = birth_dt.dt.month * 100 + birth_dt.dt.day
+    before_birthday = birthday_key > today.month * 100 + today.day
+    return (today.year - birth_dt.dt.year - before_birthday.astype(int)).astype("Int64")
 
-def extract_patient_name(patient: Dict[str, Any]) -> str:
-    """Extract patient name from FHIR structure"""
+
+def format_fhir_name(resource_name: Any) -> str:
+    """Format the first entry of a FHIR HumanName list as "Given Family" """
     name = "N/A"
-    resource_name = patient.get("resource.name")
     if resource_name and isinstance(resource_name, list) and len(resource_name) > 0:
         name_obj = resource_name[0]
         given = name_obj.get("given", [])
@@ -36,11 +37,24 @@ def extract_patient_name(patient: Dict[str, Any]) -> str:
     return name
 
 
-def extract_cohort_id(patient: Dict[str, Any]) -> str:
-    """Extract cohort ID from FHIR patient meta tags"""
+def format_fhir_names(names: pd.Series) -> pd.Series:
+    """Vectorized format_fhir_name for a Series of FHIR HumanName lists"""
+    first = names.map(lambda entries: entries[0] if isinstance(entries, list) and entries else {})
+    parts = pd.json_normalize(first.tolist()).reindex(columns=["given", "family"]).astype(object)
+    parts.index = names.index
+    
+    given = parts["given"]
+    # given is a list per the FHIR spec, but tolerate a bare string
+    first_given = given.str[0].mask(given.map(lambda g: isinstance(g, str)), given)
+    first_given = first_given.astype("string").replace("", pd.NA)
+    family = parts["family"].astype("string").replace("", pd.NA)
+    
+    return (first_given + " " + family).fillna(family).fillna(first_given).fillna("N/A").astype(object)
+
+
+def cohort_from_tags(tags: Any) -> str:
+    """Find the urn:charm:cohort code in a FHIR meta.tag list"""
     try:
-        # In the flattened DataFrame structure, meta tags are directly accessible
-        tags = patient.get("resource.meta.tag")
         if not tags or not isinstance(tags, list):
             return "N/A"
         
@@ -55,126 +69,126 @@ def extract_cohort_id(patient: Dict[str, Any]) -> str:
         return "N/A"
 
 
+def extract_patient_name(patient: Dict[str, Any]) -> str:
+    """Extract patient name from FHIR structure"""
+    return format_fhir_name(patient.get("resource.name"))
+
+
+def extract_cohort_id(patient: Dict[str, Any]) -> str:
+    """Extract cohort ID from FHIR patient meta tags"""
+    # In the flattened DataFrame structure, meta tags are directly accessible
+    return cohort_from_tags(patient.get("resource.meta.tag"))
+
+
+SEARCH_RESULT_FIELDS = [
+    "id", "patientId", "resource.name", "resource.gender", "resource.birthDate",
+    "resource.maritalStatus.text", "resource.meta.tag"
+]
+
+
 def process_patient_search_results(patients_list: List[Dict[str, Any]]) -> pd.DataFrame:
-    """Process patient search results into a DataFrame"""
-    patient_data = []
-    for patient in patients_list:
-        # Extract patient ID
-        patient_id = patient.get("id") or patient.get("patientId", "N/A")
-        
-        # Extract name from FHIR structure
-        name = extract_patient_name(patient)
-        
-        # Extract gender and birth date
-        gender = patient.get("resource.gender", "N/A")
-        birth_date = patient.get("resource.birthDate", "N/A")
-        
-        # Calculate age
-        age = calculate_age(birth_date) if birth_date != "N/A" else "N/A"
-        
-        # Extract marital status
-        marital_status = patient.get("resource.maritalStatus.text", "N/A")
-        
-        # Extract cohort ID from meta tags
-        cohort_id = extract_cohort_id(patient)
-        
-        patient_data.append({
-            "ID": patient_id,
-            "Name": name,
-            "Gender": gender.title() if gender != "N/A" else "N/A",
-            "Age": age,
-            "Birth Date": birth_date,
-            "Marital Status": marital_status,
-            "Cohort ID": cohort_id
-        })
+    """Process patient search results into a DataFrame, column by column"""
+    # Only the needed fields are materialized; flattened search hits carry many more keys
+    raw = pd.DataFrame.from_records(patients_list, columns=SEARCH_RESULT_FIELDS).astype(object)
     
-    return pd.DataFrame(patient_data)
+    birth_dates = raw["resource.birthDate"].fillna("N/A")
+    # Age stays numeric (nullable Int64); "N/A" is only substituted for display
+    ages = calculate_ages(raw["resource.birthDate"])
+    
+    return pd.DataFrame({
+        "ID": raw["id"].fillna(raw["patientId"]).fillna("N/A"),
+        "Name": format_fhir_names(raw["resource.name"]),
+        "Gender": raw["resource.gender"].fillna("N/A").str.title(),
+        "Age": ages,
+        "Birth Date": birth_dates,
+        "Marital Status": raw["resource.maritalStatus.text"].fillna("N/A"),
+        "Cohort ID": raw["resource.meta.tag"].map(cohort_from_tags)
+    })
+
+
+def for_display(df: pd.DataFrame) -> pd.DataFrame:
+    """Render missing values (e.g. <NA> ages) as "N/A" for st.dataframe"""
+    return df.astype(object).where(df.notna(), "N/A")
 
 
-def process_synthetic_patients(patients_list: List[Dict[str, Any]]) -> tuple[pd.DataFrame, List[str]]:
-    """Process synthetic patients data into DataFrame and cohort list"""
-    patient_data = []
-    all_cohorts = []
+def process_synthetic_patients(patients_list: List[Dict[str, Any]]) -> tuple[pd.DataFrame, pd.Series]:
+    """Process synthetic patients data into a DataFrame and the patient count per cohort"""
+    raw = pd.DataFrame.from_records(patients_list, columns=["id", "gender", "ethnicity", "birth_date", "cohort_ids"])
     
-    for patient in patients_list:
-        patient_id = patient.get("id", "N/A")
-        gender = patient.get("gender", "N/A").title()
-        ethnicity = patient.get("ethnicity", "N/A")
-        birth_date = patient.get("birth_date", "N/A")
-        
-        # Handle cohort_ids
-        cohort_ids = patient.get("cohort_ids", [])
-        cohort_display = ", ".join(cohort_ids) if cohort_ids else "N/A"
-        all_cohorts.extend(cohort_ids)
-        
-        # Calculate age
-        age = calculate_age(birth_date) if birth_date != "N/A" else "N/A"
-        
-        patient_data.append({
-            "ID": patient_id,
-            "Gender": gender,
-            "Age": age,
-            "Birth Date": birth_date,
-            "Ethnicity": ethnicity,
-            "Cohorts": cohort_display
-        })
+    # Handle cohort_ids
+    cohort_ids = raw["cohort_ids"].map(lambda ids: ids if isinstance(ids, list) else [])
+    # Count cohorts in one value_counts pass, chained straight from the lists
+    # (cheaper than exploding them into an intermediate object Series); the
+    # distinct cohorts are its index, so no separate set() is needed
+    cohort_counts = pd.Series(list(chain.from_iterable(cohort_ids)), dtype=object).value_counts()
+    
+    df = pd.DataFrame({
+        "ID": raw["id"].fillna("N/A"),
+        "Gender": raw["gender"].fillna("N/A").str.title(),
+        "Age": calculate_ages(raw["birth_date"]),
+        "Birth Date": raw["birth_date"].fillna("N/A"),
+        "Ethnicity": raw["ethnicity"].fillna("N/A"),
+        "Cohorts": cohort_ids.map(lambda ids: ", ".join(ids) if ids else "N/A")
+    })
     
-    return pd.DataFrame(patient_data), all_cohorts
+    return df, cohort_counts
 
 
 def process_cohorts_data(cohorts: List[Dict[str, Any]]) -> pd.DataFrame:
     """Process cohorts data into a DataFrame"""
-    cohort_data = []
-    for cohort in cohorts:
-        cohort_data.append({
-            "Cohort ID": cohort.get("cohort_id", "N/A"),
-            "Patient Count": cohort.get("patient_count", 0),
-            "Source": cohort.get("source", "N/A"),
-            "Created": cohort.get("created_at", "N/A")[:19] if cohort.get("created_at") else "N/A"
-        })
-    return pd.DataFrame(cohort_data)
-
-
-def create_model_input_form(example: Dict[str, Any], model_image: str) -> Dict[str, Any]:
-    """Create a dynamic input form for model testing based on example data"""
+    raw = pd.DataFrame.from_records(cohorts, columns=["cohort_id", "patient_count", "source", "created_at"])
+    # Trim timestamps to the second; missing or empty ones become "N/A"
+    created = raw["created_at"].astype(object).replace("", None)
+    return pd.DataFrame({
+        "Cohort ID": raw["cohort_id"].fillna("N/A"),
+        "Patient Count": raw["patient_count"].fillna(0).astype("int64"),
+        "Source": raw["source"].fillna("N/A"),
+        "Created": created.str[:19].fillna("N/A")
+    })
+
+
+# Input widget for each JSON value type in a model example; exact types, so bools
+# are not mistaken for ints. Anything else is passed through unchanged.
+WIDGET_TYPE_BY_VALUE_TYPE = {bool: "checkbox", int: "int", float: "float", str: "text"}
+
+
+def build_widget_plan(example: Dict[str, Any]) -> List[Tuple[str, str, Any]]:
+    """Derive a (key, widget_type, default) input spec from a model's example record"""
+    return [
+        (key, WIDGET_TYPE_BY_VALUE_TYPE.get(type(value), "constant"), value)
+        for key, value in example.items()
+    ]
+
+
+# Streamlit widget function and extra arguments for each widget type in a plan
+WIDGETS = {
+    "checkbox": ("checkbox", {}),
+    "int": ("number_input", {"step": 1}),
+    "float": ("number_input", {"step": 0.1}),
+    "text": ("text_input", {}),
+}
+
+
+def create_model_input_form(widget_plan: List[Tuple[str, str, Any]], model_image: str) -> Dict[str, Any]:
+    """Create a dynamic input form for model testing from a precomputed widget plan"""
     import streamlit as st
     
     test_input = {}
-    for key, value in example.items():
-        if isinstance(value, bool):
-            test_input[key] = st.checkbox(
-                f"{key}", 
-                value=value, 
-                key=f"{model_image}_{key}"
-            )
-        elif isinstance(value, int):
-            test_input[key] = st.number_input(
-                f"{key}", 
-                value=value, 
-                step=1,
-                key=f"{model_image}_{key}"
-            )
-        elif isinstance(value, float):
-            test_input[key] = st.number_input(
-                f"{key}", 
-                value=value, 
-                step=0.1,
-                key=f"{model_image}_{key}"
-            )
-        elif isinstance(value, str):
-            test_input[key] = st.text_input(
-                f"{key}", 
-                value=value, 
-                key=f"{model_image}_{key}"
-            )
-        else:
+    for key, widget_type, value in widget_plan:
+        widget = WIDGETS.get(widget_type)
+        if widget is None:
             test_input[key] = value
+            continue
+        widget_name, widget_kwargs = widget
+        test_input[key] = getattr(st, widget_name)(f"{key}", value=value, key=f"{model_image}_{key}", **widget_kwargs)
     
     return test_input
 
 
-def get_system_stats(models_count: int, services_healthy: int, total_services: int) -> Dict[str, Any]:
-    """Calculate system statistics"""
+def get_system_stats(models_count: int, health_status: Dict[str, bool]) -> Dict[str, Any]:
+    """Calculate system statistics from a precomputed service health map"""
+    services_healthy = sum(health_status.values())
+    total_services = len(health_status)
     return {
         "models_available": models_count,
         "services_healthy": services_healthy,
@@ -1,4 +1,5 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse, StreamingResponse
 import pandas as pd
 import os
@@ -6,18 +7,23 @@ import subprocess
 import tempfile
 import shutil
 import json
-import glob
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from pydantic import BaseModel, Field, field_validator
 from typing import Optional, Dict, List, Set
 import re
 import logging
 import uuid
 import asyncio
-from datetime import datetime
+from datetime import date, datetime
 import random
 import csv
 import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 
 # Create a logger
 logging.basicConfig(level=logging.INFO)
@@ -32,6 +38,38 @@ jobs_lock = threading.Lock()
 # Demographics data cache
 demographics_data = None
 
+# One pooled session for every HAPI FHIR call, so bundle uploads and paged
+# fetches reuse keep-alive connections instead of reconnecting per request.
+# Server errors are retried with exponential backoff; refused connections are
+# not, so availability checks against a down server still fail fast.
+hapi_session = requests.Session()
+hapi_adapter = HTTPAdapter(
+    max_retries=Retry(
+        total=3,
+        connect=0,
+        backoff_factor=1,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET", "POST", "PUT", "DELETE"]
+    ),
+    pool_maxsize=32
+)
+hapi_session.mount("http://", hapi_adapter)
+hapi_session.mount("https://", hapi_adapter)
+
+# A HAPI availability check that succeeded is trusted for a few seconds, so
+# back-to-back requests and jobs don't each pay a $meta round trip first
+HAPI_CHECK_TTL = 5
+hapi_checked_at: Dict[str, float] = {}
+
+# Patient bundles are uploaded concurrently; HAPI is I/O-bound per request, so a
+# few workers sharing the pooled session keep it busy without flooding it
+UPLOAD_WORKERS = 8
+upload_executor = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix="hapi-upload")
+
+# Search result pages after the first are fetched concurrently by offset
+PAGE_SIZE = 500
+page_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hapi-pages")
+
 class JobStatus:
     def __init__(self, job_id: str, request_data: dict):
         self.id = job_id
@@ -150,7 +188,7 @@ def redirect_to_docs():
 
 
 @app.get("/health")
-async def health_check():
+def health_check():
     """Health check endpoint"""
     try:
         # Check core Synthea dependencies
@@ -167,7 +205,7 @@ async def health_check():
         hapi_connected = False
         hapi_error = None
         try:
-            test_response = requests.get(f"{hapi_url}/$meta", timeout=5)
+            test_response = hapi_session.get(f"{hapi_url}/$meta", timeout=5)
             hapi_connected = test_response.status_code == 200
         except Exception as e:
             hapi_error = str(e)
@@ -223,6 +261,24 @@ async def health_check():
         }
 
 
+# Synthea output is read straight back for upload (or zipping), so it is written to
+# RAM-backed /dev/shm when that has room for it. docker-compose.yml sizes it for a
+# 100-patient chunk; runs that don't fit fall back to the regular temp directory.
+SHM_DIR = "/dev/shm"
+SYNTHEA_BYTES_PER_PATIENT = 4 * 1024 * 1024
+
+
+def synthea_output_parent(num_patients):
+    """ Returns the directory to create a Synthea run's output directory in, or None for the system default. """
+    try:
+        # Leave headroom for the next chunk and other jobs writing there at the same time
+        if shutil.disk_usage(SHM_DIR).free > 2 * num_patients * SYNTHEA_BYTES_PER_PATIENT:
+            return SHM_DIR
+    except OSError:
+        pass
+    return None
+
+
 async def run_synthea(num_patients, num_years, min_age=0, max_age=140, gender="both", exporter="fhir", state=None, city=None):
     logger.debug(f"Running Synthea with parameters: patients={num_patients}, years={num_years}, "
                 f"age={min_age}-{max_age}, gender={gender}, exporter={exporter}, state={state}, city={city}")
@@ -243,7 +299,7 @@ async def run_synthea(num_patients, num_years, min_age=0, max_age=140, gender="b
     Raises:
         Exception: If the output directory is not found."""
     
-    temp_dir = tempfile.mkdtemp()
+    temp_dir = tempfile.mkdtemp(dir=synthea_output_parent(num_patients))
     # Calculate memory allocation based on patient count
     # Minimum 1GB, add 256MB per 100 patients, cap at 4GB
     memory_mb = min(4096, 1024 + (num_patients // 100) * 256)
@@ -312,12 +368,20 @@ async def run_synthea(num_patients, num_years, min_age=0, max_age=140, gender="b
         stderr=asyncio.subprocess.PIPE
     )
     
-    stdout, stderr = await process.communicate()
+    try:
+        stdout, stderr = await process.communicate()
+    except asyncio.CancelledError:
+        # Cancelled (job stopped or request timed out): don't leave Java running
+        process.kill()
+        await process.wait()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
     
     if process.returncode != 0:
         error_msg = f"Synthea process failed with return code {process.returncode}"
         if stderr:
             error_msg += f": {stderr.decode()}"
+        shutil.rmtree(temp_dir, ignore_errors=True)
         raise subprocess.CalledProcessError(process.returncode, cmd, stderr)
     
     # Determine the output directory based on the exporter
@@ -326,6 +390,7 @@ async def run_synthea(num_patients, num_years, min_age=0, max_age=140, gender="b
         # Try to find what directory was actually created
         possible_dirs = [d for d in os.listdir(temp_dir) if os.path.isdir(os.path.join(temp_dir, d))]
         logger.error(f"Expected directory '{exporter}' not found. Available directories: {possible_dirs}")
+        shutil.rmtree(temp_dir, ignore_errors=True)
         raise Exception(f"{exporter.upper()} output directory not found!")
     return temp_dir, output_dir
 
@@ -337,42 +402,48 @@ async def run_synthea(num_patients, num_years, min_age=0, max_age=140, gender="b
 # tags are of the form system: code, e.g. {"urn:charm:cohort": "cohortA", "urn:charm:datatype": "synthetic"}
 def apply_tags(resource, tags: dict[str, str] = None):
     """
-    Recursively applies FHIR tags (in meta.tag) to all resources in a bundle or a single resource.
+    Applies FHIR tags (in meta.tag) to all resources in a bundle or a single resource.
+    Walks nested bundle entries and contained resources with an explicit stack, so deep
+    nesting can't hit the recursion limit.
     Args:
         resource: dict representing a FHIR resource (could be Bundle or any resource)
         tags: dict of {system: code} to apply as tags
     """
-    if tags is None:
-        tags = {}
-
-    # --- Step 1: Add tags to this resource's meta ---
-    meta = resource.setdefault("meta", {})
-    meta_tags = meta.setdefault("tag", [])
-
-    # Index existing tags by system for easy update
-    tag_index = {t["system"]: t for t in meta_tags if "system" in t and "code" in t}
-
-    # Apply or update each tag
-    for system, code in tags.items():
-        if system in tag_index:
-            tag_index[system]["code"] = code
+    tag_items = list(tags.items()) if tags else []
+    stack = [resource]
+    while stack:
+        current = stack.pop()
+
+        # --- Step 1: Add tags to this resource's meta ---
+        meta = current.get("meta")
+        if meta is None:
+            meta = current["meta"] = {}
+        meta_tags = meta.get("tag")
+        if not meta_tags:
+            # Untagged, as Synthea writes every resource: the tags are simply the new ones
+            meta["tag"] = [{"system": system, "code": code} for system, code in tag_items]
         else:
-            meta_tags.append({
-                "system": system,
-                "code": code
-            })
+            # Index existing tags by system for easy update
+            tag_index = {t["system"]: t for t in meta_tags if "system" in t and "code" in t}
+
+            # Apply or update each tag
+            for system, code in tag_items:
+                existing = tag_index.get(system)
+                if existing is not None:
+                    existing["code"] = code
+                else:
+                    meta_tags.append({"system": system, "code": code})
 
-    # --- Step 2: Recurse if this is a bundle ---
-    if resource.get("resourceType") == "Bundle":
-        for entry in resource.get("entry", []):
-            entry_resource = entry.get("resource")
-            if entry_resource:
-                apply_tags(entry_resource, tags)
+        # --- Step 2: Queue entries if this is a bundle ---
+        if current.get("resourceType") == "Bundle":
+            for entry in current.get("entry", []):
+                entry_resource = entry.get("resource")
+                if entry_resource:
+                    stack.append(entry_resource)
 
-    # --- Step 3 (optional): Handle contained resources ---
-    if "contained" in resource:
-        for contained in resource["contained"]:
-            apply_tags(contained, tags)
+        # --- Step 3 (optional): Queue contained resources ---
+        if "contained" in current:
+            stack.extend(current["contained"])
 
 
 
@@ -387,10 +458,10 @@ def fetch_group_by_id(hapi_url, group_id):
     url = f"{hapi_url.rstrip('/')}/Group/{group_id}"
     logger.debug(f"Fetching group from URL: {url}")
     try:
-        r = requests.get(url)
+        r = hapi_session.get(url)
         logger.debug(f"Group fetch response status: {r.status_code}")
         if r.status_code == 200:
-            group_data = r.json()
+            group_data = json.loads(r.content)
             logger.debug(f"Group data retrieved: ID={group_data.get('id')}, Type={group_data.get('resourceType')}")
             if 'member' in group_data:
                 logger.debug(f"Group has {len(group_data['member'])} members")
@@ -404,46 +475,109 @@ def fetch_group_by_id(hapi_url, group_id):
         return None
 
 
+def check_hapi(hapi_url, timeout=None):
+    """ Raises if the HAPI FHIR server at hapi_url doesn't answer its $meta endpoint.
+    A successful check is remembered for HAPI_CHECK_TTL seconds.
+    """
+    checked_at = hapi_checked_at.get(hapi_url)
+    if checked_at is not None and time.monotonic() - checked_at < HAPI_CHECK_TTL:
+        return
+    r = hapi_session.get(f"{hapi_url}/$meta", timeout=timeout)
+    r.raise_for_status()
+    hapi_checked_at[hapi_url] = time.monotonic()
+
+
+def next_page_url(bundle):
+    """ Returns the URL of a searchset Bundle's 'next' link, or None on the last page. """
+    for link in bundle.get("link", []):
+        if link.get("relation") == "next" and "url" in link:
+            return link["url"]
+    return None
+
+
+def remaining_page_urls(next_url, total):
+    """ Derives the URL of every remaining page from HAPI's first 'next' link.
+    HAPI pages a stored search with _getpages/_getpagesoffset, so with the accurate
+    total from the first page each later page can be addressed directly.
+    Returns:
+        A list of page URLs, or None if the link doesn't use offset paging.
+    """
+    parts = urlsplit(next_url)
+    params = parse_qsl(parts.query)
+    step = next((int(value) for key, value in params if key == "_getpagesoffset" and value.isdigit()), 0)
+    if not isinstance(total, int) or step <= 0:
+        return None
+    urls = []
+    for offset in range(step, total, step):
+        query = urlencode([(key, str(offset) if key == "_getpagesoffset" else value) for key, value in params])
+        urls.append(urlunsplit(parts._replace(query=query)))
+    return urls
+
+
+def fetch_page(url, attempts=2):
+    """ Fetches one search result page, retrying it once if HAPI doesn't answer 200.
+    Raises:
+        RuntimeError: If every attempt failed; a page can't be skipped without losing its resources.
+    """
+    for attempt in range(1, attempts + 1):
+        try:
+            r = hapi_session.get(url)
+            if r.status_code == 200:
+                return json.loads(r.content)
+            error = f"HTTP {r.status_code}"
+        except requests.RequestException as e:
+            error = str(e)
+        logger.warning("Error fetching page %s (attempt %d/%d): %s", url, attempt, attempts, error)
+    raise RuntimeError(f"Could not fetch search page {url}: {error}")
+
+
+def fetch_all_resources(hapi_url, resource_type):
+    """ Fetches every resource of one type from the HAPI FHIR server.
+    The first page carries the total and HAPI's paging link; the remaining pages are then
+    requested concurrently instead of following 'next' links one round trip at a time.
+    Args:
+        hapi_url: Base URL of the HAPI FHIR server.
+        resource_type: FHIR resource type to fetch, e.g. "Patient".
+    Returns:
+        A list of resources as dictionaries.
+    Raises:
+        RuntimeError: If any page can't be fetched, rather than returning a partial list.
+    """
+    first_url = f"{hapi_url.rstrip('/')}/{resource_type}?_count={PAGE_SIZE}&_total=accurate"
+    logger.debug("Fetching %s resources from: %s", resource_type, first_url)
+    first_page = fetch_page(first_url)
+    
+    pages = [first_page]
+    next_url = next_page_url(first_page)
+    page_urls = remaining_page_urls(next_url, first_page.get("total")) if next_url else []
+    if page_urls is not None:
+        pages.extend(page_executor.map(fetch_page, page_urls))
+    else:
+        # Unrecognized paging scheme: follow the 'next' links in order
+        while next_url:
+            page = fetch_page(next_url)
+            pages.append(page)
+            next_url = next_page_url(page)
+    
+    return [entry["resource"] for page in pages for entry in page.get("entry", [])]
+
+
 def fetch_all_groups(hapi_url):
     """ Fetches all FHIR Group resources from the HAPI FHIR server.
     Args:
         hapi_url: Base URL of the HAPI FHIR server.
     Returns:
         A list of Group resources as dictionaries.
+    Raises:
+        RuntimeError: If the groups can't all be fetched.
     """
     try:
-        all_groups = []
-        next_url = f"{hapi_url.rstrip('/')}/Group?_count=500"  # Increased count for efficiency
-        
-        # Keep fetching pages until there are no more
-        while next_url:
-            print(f"Fetching groups from: {next_url}")
-            r = requests.get(next_url)
-            if r.status_code != 200:
-                print(f"Error fetching groups: HTTP {r.status_code}")
-                break
-                
-            bundle = r.json()
-            
-            # Extract groups from this page
-            if "entry" in bundle:
-                page_groups = [entry["resource"] for entry in bundle["entry"]]
-                all_groups.extend(page_groups)
-                print(f"Retrieved {len(page_groups)} groups from this page. Total so far: {len(all_groups)}")
-            
-            # Look for the 'next' link to continue pagination
-            next_url = None
-            if "link" in bundle:
-                for link in bundle["link"]:
-                    if link.get("relation") == "next" and "url" in link:
-                        next_url = link["url"]
-                        break
-        
-        print(f"Total groups retrieved: {len(all_groups)}")
-        return all_groups
+        all_groups = fetch_all_resources(hapi_url, "Group")
     except Exception as e:
-        print(f"Error fetching groups: {e}")
-        return []
+        logger.error("Error fetching groups: %s", e)
+        raise
+    logger.debug("Total groups retrieved: %d", len(all_groups))
+    return all_groups
 
 
 def fetch_all_patients(hapi_url):
@@ -452,56 +586,34 @@ def fetch_all_patients(hapi_url):
         hapi_url: Base URL of the HAPI FHIR server.
     Returns:
         A list of Patient resources as dictionaries.
+    Raises:
+        RuntimeError: If the patients can't all be fetched.
     """
     try:
-        all_patients = []
-        next_url = f"{hapi_url.rstrip('/')}/Patient?_count=500"  # Increased count for efficiency
-        
-        # Keep fetching pages until there are no more
-        while next_url:
-            print(f"Fetching patients from: {next_url}")
-            r = requests.get(next_url)
-            if r.status_code != 200:
-                print(f"Error fetching patients: HTTP {r.status_code}")
-                break
-                
-            bundle = r.json()
-            
-            # Extract patients from this page
-            if "entry" in bundle:
-                page_patients = [entry["resource"] for entry in bundle["entry"]]
-                all_patients.extend(page_patients)
-                print(f"Retrieved {len(page_patients)} patients from this page. Total so far: {len(all_patients)}")
-            
-            # Look for the 'next' link to continue pagination
-            next_url = None
-            if "link" in bundle:
-                for link in bundle["link"]:
-                    if link.get("relation") == "next" and "url" in link:
-                        next_url = link["url"]
-                        break
-        
-        print(f"Total patients retrieved: {len(all_patients)}")
-        return all_patients
+        all_patients = fetch_all_resources(hapi_url, "Patient")
     except Exception as e:
-        print(f"Error fetching patients: {e}")
-        return []
+        logger.error("Error fetching patients: %s", e)
+        raise
+    logger.debug("Total patients retrieved: %d", len(all_patients))
+    return all_patients
 
 
 def merge_group_members(existing_group, new_patient_ids):
     """
     Merges new patient IDs into an existing Group resource's member list.
     """
+    members = existing_group.setdefault("member", [])
     # Existing member patient IDs
     existing_member_ids = set()
-    for member in existing_group.get("member", []):
+    for member in members:
         ref = member.get("entity", {}).get("reference", "")
         if ref.startswith("Patient/"):
             existing_member_ids.add(ref.split("/", 1)[1])
-    # Merge with new patients
-    all_ids = existing_member_ids | set(new_patient_ids)
-    # Replace the member array with merged list
-    existing_group["member"] = [{"entity": {"reference": f"Patient/{pid}"}} for pid in all_ids]
+    # Append only the patients not already in the group, keeping the existing entries as they are
+    members.extend(
+        {"entity": {"reference": f"Patient/{pid}"}}
+        for pid in dict.fromkeys(new_patient_ids) if pid not in existing_member_ids
+    )
     return existing_group
 
 
@@ -519,19 +631,23 @@ def post_bundle(json_file, hapi_url, tags: dict[str, str] = None): # returns (su
         - patient_ids (set of str): Set of patient IDs found in the bundle, or None if no patients were found.
     """
     patient_ids = set()
-    with open(json_file, "r") as f:
-        bundle = json.load(f)
+    with open(json_file, "rb") as f:
+        body = f.read()
+    bundle = json.loads(body)
+
+    # collect patient IDs
+    if bundle.get("resourceType") == "Bundle" and "entry" in bundle:
+        for entry in bundle["entry"]:
+            if "resource" in entry and entry["resource"].get("resourceType") == "Patient":
+                patient_id = entry["resource"].get("id")
+                if patient_id:
+                    patient_ids.add(patient_id)
 
-        # collect patient IDs
-        if bundle.get("resourceType") == "Bundle" and "entry" in bundle:
-            for entry in bundle["entry"]:
-                if "resource" in entry and entry["resource"].get("resourceType") == "Patient":
-                    patient_id = entry["resource"].get("id")
-                    if patient_id:
-                        patient_ids.add(patient_id)
-         
-        if tags:
-            apply_tags(bundle, tags)
+    # Serialize once: the same bytes size the timeout and are sent as the body.
+    # Untagged bundles are posted exactly as Synthea wrote them.
+    if tags:
+        apply_tags(bundle, tags)
+        body = json.dumps(bundle, separators=(",", ":")).encode("utf-8")
 
     bundle_type = bundle.get("type")
     # Decide endpoint based on bundle type
@@ -541,32 +657,14 @@ def post_bundle(json_file, hapi_url, tags: dict[str, str] = None): # returns (su
         url = hapi_url.rstrip("/") + "/Bundle"
     try:
         # Add timeout for large bundles - calculate based on bundle size
-        bundle_size = len(json.dumps(bundle))
+        bundle_size = len(body)
         # 2 seconds per 10KB with a minimum of 15 seconds and maximum of 180 seconds
         timeout = max(15, min(180, bundle_size / 5000))
-        logger.info(f"Posting bundle {os.path.basename(json_file)} (size: {bundle_size/1024:.1f}KB) with timeout {timeout:.1f}s")
+        logger.debug("Posting bundle %s (size: %.1fKB) with timeout %.1fs", os.path.basename(json_file), bundle_size / 1024, timeout)
         
-        # Use session for connection pooling and performance
-        session = requests.Session()
-        
-        # Add retry mechanism with exponential backoff
-        from requests.adapters import HTTPAdapter
-        from urllib3.util.retry import Retry
-        
-        retry_strategy = Retry(
-            total=3,  # Maximum number of retries
-            backoff_factor=1,  # Exponential backoff
-            status_forcelist=[429, 500, 502, 503, 504],  # Retry on these status codes
-            allowed_methods=["POST"]  # Only retry POST requests
-        )
-        
-        adapter = HTTPAdapter(max_retries=retry_strategy)
-        session.mount("http://", adapter)
-        session.mount("https://", adapter)
-        
-        r = session.post(
+        r = hapi_session.post(
             url, 
-            json=bundle, 
+            data=body, 
             headers={"Content-Type": "application/fhir+json"}, 
             timeout=timeout
         )
@@ -620,24 +718,25 @@ def upsert_group(hapi_url, cohort_id, new_patient_ids, tags):
         RuntimeError: If there is an error fetching or updating the Group resource."""
     # Try to fetch existing Group
     url = f"{hapi_url.rstrip('/')}/Group/{cohort_id}"
-    existing_ids = set()
+    existing_ids = []
     group_exists = False
     try:
-        r = requests.get(url, headers={"Accept": "application/fhir+json"})
+        r = hapi_session.get(url, headers={"Accept": "application/fhir+json"})
         if r.status_code == 200:
-            group = r.json()
+            group = json.loads(r.content)
             group_exists = True
             for member in group.get("member", []):
                 ref = member.get("entity", {}).get("reference", "")
                 if ref.startswith("Patient/"):
-                    existing_ids.add(ref.split("/", 1)[1])
+                    existing_ids.append(ref.split("/", 1)[1])
         elif r.status_code != 404:
             r.raise_for_status()
     except Exception as e:
         raise RuntimeError(f"Error fetching Group/{cohort_id}: {e}")
 
-    # Merge new and existing patient ids
-    all_ids = existing_ids | set(new_patient_ids)
+    # Merge new and existing patient ids: one insertion-ordered dict dedups both without
+    # building a set of each first, and existing members keep their positions
+    all_ids = dict.fromkeys(chain(existing_ids, new_patient_ids))
 
     # Get current time in ISO format for the creation timestamp
     import datetime
@@ -667,11 +766,38 @@ def upsert_group(hapi_url, cohort_id, new_patient_ids, tags):
         logger.info(f"Adding creation timestamp {current_time} to new cohort {cohort_id}")
     if tags:
         apply_tags(group, tags)
-    r = requests.put(url, json=group, headers={"Content-Type": "application/fhir+json"})
+    r = hapi_session.put(url, json=group, headers={"Content-Type": "application/fhir+json"})
     r.raise_for_status()
     return r.text
 
 
+def add_group_members(hapi_url, cohort_id, new_patient_ids, tags):
+    """ Appends patients to a cohort's Group with a single JSON Patch request.
+    New patients are appended without downloading the existing member list. Falls back to
+    upsert_group when there is no Group to patch yet (or it has no member array to append to).
+    Args:
+        hapi_url: Base URL of the HAPI FHIR server (e.g., http://hapi:8080/fhir).
+        cohort_id: The ID of the cohort to add patients to.
+        new_patient_ids: A set of patient IDs not yet in the Group.
+        tags: Optional dictionary of tags to apply if the Group has to be created.
+    Returns:
+        The response text from the HAPI FHIR server, or None if there was nothing to add.
+    Raises:
+        RuntimeError: If the fallback upsert fails to fetch the Group resource."""
+    if not new_patient_ids:
+        return None
+    url = f"{hapi_url.rstrip('/')}/Group/{cohort_id}"
+    patch = [
+        {"op": "add", "path": "/member/-", "value": {"entity": {"reference": f"Patient/{pid}"}}}
+        for pid in new_patient_ids
+    ]
+    r = hapi_session.patch(url, data=json.dumps(patch), headers={"Content-Type": "application/json-patch+json"})
+    if r.ok:
+        return r.text
+    logger.info("Patching Group/%s failed with HTTP %s; upserting it instead", cohort_id, r.status_code)
+    return upsert_group(hapi_url, cohort_id, new_patient_ids, tags)
+
+
 class SyntheaRequest(BaseModel):
     num_patients: int = Field(10, gt=0, le=100000, description="Number of patients to generate")
     num_years: int = Field(1, gt=0, le=100, description="Years of medical history per patient")
@@ -699,6 +825,9 @@ class SyntheaRequest(BaseModel):
             )
         return v
 
+class JobStatusRequest(BaseModel):
+    job_ids: List[str] = Field(..., max_length=500, description="IDs of the jobs to report on")
+
 @app.post("/synthetic-patients")
 async def create_generation_job(request: SyntheaRequest):
     """Create a new synthetic patient generation job.
@@ -747,6 +876,14 @@ async def get_job_status(job_id: str):
         job = jobs[job_id]
     return job.to_dict()
 
+@app.post("/synthetic-patients/jobs/status")
+async def get_job_statuses(request: JobStatusRequest):
+    """Get the status of several generation jobs in one call (in request order; unknown IDs are listed separately)"""
+    with jobs_lock:
+        found = [jobs[job_id].to_dict() for job_id in request.job_ids if job_id in jobs]
+        not_found = [job_id for job_id in request.job_ids if job_id not in jobs]
+    return {"jobs": found, "not_found": not_found}
+
 @app.get("/synthetic-patients/jobs")
 async def list_recent_jobs(limit: int = 50):
     """List recent generation jobs"""
@@ -808,8 +945,7 @@ async def process_generation_job(job_id: str):
         # Check HAPI server availability
         hapi_url = "http://hapi:8080/fhir"
         try:
-            r = requests.get(hapi_url + "/$meta", timeout=10)
-            r.raise_for_status()
+            await run_in_threadpool(check_hapi, hapi_url, timeout=10)
         except Exception as e:
             job.status = "failed"
             job.error = f"HAPI FHIR server is not reachable: {str(e)}"
@@ -859,6 +995,8 @@ async def process_generation_job(job_id: str):
         
         # Process chunks
         all_patient_ids = set()
+        # Patients not yet added to the cohort Group (kept across a failed update)
+        pending_member_ids = set()
         tagset = {
             "urn:charm:cohort": request_data["cohort_id"],
             "urn:charm:datatype": "synthetic",
@@ -866,23 +1004,8 @@ async def process_generation_job(job_id: str):
             "urn:charm:created": datetime.now().isoformat()
         }
         
-        for chunk_idx, chunk in enumerate(chunks):
-            if job.status == "cancelled":
-                logger.info(f"Job {job_id} cancelled during chunk {chunk_idx + 1}")
-                return
-            
-            job.current_phase = f"Chunk {chunk['chunk_id']}/{len(chunks)}: Generating {chunk['num_patients']} patients in {chunk['state']}"
-            job.progress = chunk_idx / len(chunks) * 0.9  # Each chunk (including upsert) is 90% of total
-            
-            # Estimate remaining time
-            if chunk_idx > 0:
-                elapsed = (datetime.now() - job.started_at).total_seconds()
-                avg_time_per_chunk = elapsed / chunk_idx
-                remaining_chunks = len(chunks) - chunk_idx
-                job.estimated_remaining_seconds = int(avg_time_per_chunk * remaining_chunks)
-            
-            # Generate chunk
-            temp_dir, output_dir = await run_synthea(
+        def generate_chunk(chunk):
+            return asyncio.create_task(run_synthea(
                 num_patients=chunk["num_patients"],
                 num_years=request_data["num_years"],
                 min_age=request_data["min_age"],
@@ -891,35 +1014,66 @@ async def process_generation_job(job_id: str):
                 exporter=request_data["exporter"],
                 state=chunk["state"],
                 city=chunk["city"]
-            )
-            
-            job.current_phase = f"Chunk {chunk['chunk_id']}/{len(chunks)}: Uploading to HAPI"
-            
-            # Upload chunk
-            chunk_patient_ids = await upload_chunk_to_hapi(
-                output_dir, hapi_url, tagset, job_id, chunk["chunk_id"]
-            )
-            all_patient_ids.update(chunk_patient_ids)
-            
-            # Update cohort with current patient set after each chunk
-            job.current_phase = f"Chunk {chunk['chunk_id']}/{len(chunks)}: Updating cohort"
-            try:
-                upsert_group(hapi_url, request_data["cohort_id"], all_patient_ids, tagset)
-                logger.info(f"Job {job_id}: Updated cohort with {len(all_patient_ids)} patients after chunk {chunk['chunk_id']}")
-            except Exception as e:
-                logger.error(f"Job {job_id}: Failed to update cohort after chunk {chunk['chunk_id']}: {str(e)}")
-                # Continue processing - we'll try again with the next chunk
-            
-            job.completed_chunks += 1
-            
-            # Update progress after completing this chunk
-            job.progress = (chunk_idx + 1) / len(chunks) * 0.9
-            
-            # Clean up chunk files immediately
-            shutil.rmtree(temp_dir, ignore_errors=True)
-            
-            # Brief pause between chunks
-            await asyncio.sleep(1)
+            ))
+        
+        # Chunks are pipelined: while one chunk uploads, Synthea already generates the next.
+        # (Within a chunk, patient bundles reference the practitioner and hospital bundles
+        # Synthea writes last, so a chunk is only uploaded once its run has finished.)
+        next_generation = generate_chunk(chunks[0])
+        try:
+            for chunk_idx, chunk in enumerate(chunks):
+                if job.status == "cancelled":
+                    logger.info(f"Job {job_id} cancelled during chunk {chunk_idx + 1}")
+                    return
+                
+                job.current_phase = f"Chunk {chunk['chunk_id']}/{len(chunks)}: Generating {chunk['num_patients']} patients in {chunk['state']}"
+                job.progress = chunk_idx / len(chunks) * 0.9  # Each chunk (including upsert) is 90% of total
+                
+                # Estimate remaining time
+                if chunk_idx > 0:
+                    elapsed = (datetime.now() - job.started_at).total_seconds()
+                    avg_time_per_chunk = elapsed / chunk_idx
+                    remaining_chunks = len(chunks) - chunk_idx
+                    job.estimated_remaining_seconds = int(avg_time_per_chunk * remaining_chunks)
+                
+                # Wait for this chunk, then start generating the next one
+                temp_dir, output_dir = await next_generation
+                next_generation = generate_chunk(chunks[chunk_idx + 1]) if chunk_idx + 1 < len(chunks) else None
+                
+                try:
+                    job.current_phase = f"Chunk {chunk['chunk_id']}/{len(chunks)}: Uploading to HAPI"
+                    
+                    # Upload chunk
+                    chunk_patient_ids = await upload_chunk_to_hapi(
+                        output_dir, hapi_url, tagset, job_id, chunk["chunk_id"]
+                    )
+                    all_patient_ids.update(chunk_patient_ids)
+                    pending_member_ids.update(chunk_patient_ids)
+                    
+                    # Update cohort with current patient set after each chunk
+                    job.current_phase = f"Chunk {chunk['chunk_id']}/{len(chunks)}: Updating cohort"
+                    try:
+                        await run_in_threadpool(add_group_members, hapi_url, request_data["cohort_id"], pending_member_ids, tagset)
+                        pending_member_ids.clear()
+                        logger.info(f"Job {job_id}: Updated cohort with {len(all_patient_ids)} patients after chunk {chunk['chunk_id']}")
+                    except Exception as e:
+                        logger.error(f"Job {job_id}: Failed to update cohort after chunk {chunk['chunk_id']}: {str(e)}")
+                        # Continue processing - we'll try again with the next chunk
+                    
+                    # The chunk's patients are on HAPI now, so the shared listing is out of date
+                    invalidate_patient_list()
+                finally:
+                    # Clean up chunk files immediately
+                    shutil.rmtree(temp_dir, ignore_errors=True)
+                
+                job.completed_chunks += 1
+                
+                # Update progress after completing this chunk
+                job.progress = (chunk_idx + 1) / len(chunks) * 0.9
+        finally:
+            # A job that stops early must not leave the next chunk's Synthea run behind
+            if next_generation is not None:
+                await discard_generation(next_generation)
         
         # Job completed successfully (cohort was updated after each chunk)
         job.status = "completed"
@@ -943,194 +1097,337 @@ async def process_generation_job(job_id: str):
         job.current_phase = "failed"
         logger.error(f"Job {job_id} failed: {str(e)}", exc_info=True)
 
+def post_bundle_with_retry(json_file, hapi_url, tags, log_prefix, max_retries=3, retry_delay=2) -> Set[str]:
+    """ Posts a patient bundle, retrying failed attempts after a short delay.
+    Returns:
+        The patient IDs in the bundle, or an empty set if every attempt failed.
+    """
+    for retry in range(max_retries):
+        try:
+            success, error_info, new_patient_ids = post_bundle(json_file, hapi_url, tags=tags)
+            if success:
+                return new_patient_ids or set()
+            if retry == max_retries - 1:
+                logger.error(f"{log_prefix}: Failed to upload {os.path.basename(json_file)} after {max_retries} attempts")
+        except Exception as e:
+            if retry == max_retries - 1:
+                logger.error(f"{log_prefix}: Error uploading {os.path.basename(json_file)}: {str(e)}")
+        if retry < max_retries - 1:
+            time.sleep(retry_delay)
+    return set()
+
+
+async def discard_generation(task: asyncio.Task):
+    """Stop a run_synthea task whose output is no longer wanted and remove whatever it produced"""
+    if not task.done():
+        task.cancel()
+    try:
+        temp_dir, _ = await task
+    except (asyncio.CancelledError, Exception):
+        # run_synthea removes its own directory when cancelled or failing
+        return
+    shutil.rmtree(temp_dir, ignore_errors=True)
+
+
 async def upload_chunk_to_hapi(output_dir: str, hapi_url: str, tags: dict, job_id: str, chunk_id: int) -> Set[str]:
     """Upload a chunk's generated files to HAPI server"""
-    # Get all JSON files
-    special_files = sorted(glob.glob(os.path.join(output_dir, "practitionerInformation*.json"))) + \
-                    sorted(glob.glob(os.path.join(output_dir, "hospitalInformation*.json")))
-    all_files = sorted(glob.glob(os.path.join(output_dir, "*.json")))
-    patient_files = [f for f in all_files if f not in special_files]
+    # Get all JSON files, classified in a single directory scan
+    practitioner_files, hospital_files, patient_files = [], [], []
+    with os.scandir(output_dir) as entries:
+        for entry in entries:
+            name = entry.name
+            if not name.endswith(".json") or name.startswith(".") or not entry.is_file():
+                continue
+            if name.startswith("practitionerInformation"):
+                practitioner_files.append(entry.path)
+            elif name.startswith("hospitalInformation"):
+                hospital_files.append(entry.path)
+            else:
+                patient_files.append(entry.path)
+    special_files = sorted(practitioner_files) + sorted(hospital_files)
+    patient_files.sort()
     
     patient_ids = set()
     
     # Upload special files first (if any)
     for json_file in special_files:
         try:
-            success, error_info, _ = post_bundle(json_file, hapi_url, tags=tags)
+            success, error_info, _ = await run_in_threadpool(post_bundle, json_file, hapi_url, tags=tags)
             if not success:
                 logger.warning(f"Job {job_id} chunk {chunk_id}: Failed to upload {os.path.basename(json_file)}: {error_info}")
         except Exception as e:
             logger.warning(f"Job {job_id} chunk {chunk_id}: Error uploading {os.path.basename(json_file)}: {str(e)}")
     
-    # Upload patient files with retry logic
-    max_retries = 3
-    retry_delay = 2
+    # Upload patient files concurrently, each with its own retries
+    loop = asyncio.get_running_loop()
+    uploads = [
+        loop.run_in_executor(upload_executor, post_bundle_with_retry, json_file, hapi_url, tags, f"Job {job_id} chunk {chunk_id}")
+        for json_file in patient_files
+    ]
+    for new_patient_ids in await asyncio.gather(*uploads):
+        patient_ids.update(new_patient_ids)
     
-    for json_file in patient_files:
-        for retry in range(max_retries):
-            try:
-                success, error_info, new_patient_ids = post_bundle(json_file, hapi_url, tags=tags)
-                if success and new_patient_ids:
-                    patient_ids.update(new_patient_ids)
-                    break  # Success
-                elif not success:
-                    if retry < max_retries - 1:
-                        await asyncio.sleep(retry_delay)
-                    else:
-                        logger.error(f"Job {job_id} chunk {chunk_id}: Failed to upload {os.path.basename(json_file)} after {max_retries} attempts")
-            except Exception as e:
-                if retry < max_retries - 1:
-                    await asyncio.sleep(retry_delay)
-                else:
-                    logger.error(f"Job {job_id} chunk {chunk_id}: Error uploading {os.path.basename(json_file)}: {str(e)}")
+    # One summary line per chunk; per-bundle details are debug-level
+    logger.info("Job %s chunk %s: uploaded %d bundles with %d patients",
+                job_id, chunk_id, len(special_files) + len(patient_files), len(patient_ids))
     
     return patient_ids
 
 
-@app.get("/list-all-patients", response_class=JSONResponse)
-async def list_all_patients():
-    """ Lists all patients stored in the HAPI FHIR server with specific demographic information.
+def build_patient_list(hapi_url):
+    """ Builds the demographic summary of every patient on the HAPI FHIR server.
+    Args:
+        hapi_url: Base URL of the HAPI FHIR server.
     Returns:
-        A JSON object containing a list of patients with their IDs, gender, ethnicity, date of birth, and cohort IDs
+        A list of dicts with each patient's ID, gender, ethnicity, date of birth, and cohort IDs.
+    """
+    # Fetch all groups/cohorts
+    groups = fetch_all_groups(hapi_url)
+    logger.debug("Found %d groups/cohorts", len(groups))
+    
+    # Create a mapping of patient IDs to cohorts
+    patient_to_cohorts = {}
+    cohort_info = []
+    
+    # Process each group/cohort
+    for group in groups:
+        try:
+            cohort_id = group.get("id")
+            cohort_name = group.get("name", cohort_id)
+            
+            # Get tags if available
+            tags = {}
+            if "meta" in group and "tag" in group["meta"]:
+                for tag in group["meta"]["tag"]:
+                    if "system" in tag and "code" in tag:
+                        tags[tag["system"]] = tag["code"]
+            
+            # Get members
+            members = []
+            if "member" in group:
+                for member in group["member"]:
+                    if "entity" in member and "reference" in member["entity"]:
+                        patient_ref = member["entity"]["reference"]
+                        if patient_ref.startswith("Patient/"):
+                            patient_id = patient_ref[8:]  # Remove "Patient/" prefix
+                            members.append(patient_id)
+                            
+                            # Add this cohort to the patient's list of cohorts
+                            if patient_id not in patient_to_cohorts:
+                                patient_to_cohorts[patient_id] = []
+                            patient_to_cohorts[patient_id].append({
+                                "cohort_id": cohort_id,
+                                "cohort_name": cohort_name
+                            })
+            
+            # Add cohort info to the list
+            cohort_info.append({
+                "cohort_id": cohort_id,
+                "name": cohort_name,
+                "member_count": len(members),
+                "tags": tags
+            })
+        except Exception as e:
+            logger.warning("Error processing group %s: %s", group.get('id', 'unknown'), e)
+    
+    # Fetch all patients to ensure we include those not in any cohort
+    patients = fetch_all_patients(hapi_url)
+    logger.debug("Found %d patients", len(patients))
+    
+    # Create the final patient list
+    patient_list = []
+    for patient in patients:
+        try:
+            patient_id = patient.get("id")
+            if not patient_id:
+                continue
+            
+            # Get birth date if available
+            birth_date = patient.get("birthDate", "unknown")
+            
+            # Get cohorts from Group memberships
+            cohorts = patient_to_cohorts.get(patient_id, [])
+            cohort_ids = [c.get("cohort_id") for c in cohorts]
+            
+            # ALSO check for cohort tags in the patient's metadata
+            if "meta" in patient and "tag" in patient["meta"]:
+                for tag in patient["meta"]["tag"]:
+                    if tag.get("system") == "urn:charm:cohort":
+                        cohort_id = tag.get("code")
+                        if cohort_id not in cohort_ids:
+                            cohort_ids.append(cohort_id)
+            
+            # Get gender if available
+            gender = patient.get("gender", "unknown")
+            
+            # Extract ethnicity from extensions
+            ethnicity = "unknown"
+            if "extension" in patient:
+                for ext in patient["extension"]:
+                    # Look for US Core ethnicity extension
+                    if ext.get("url") == "http://hl7.org/fhir/us/core/StructureDefinition/us-core-ethnicity":
+                        # Extract text representation if available
+                        for nested_ext in ext.get("extension", []):
+                            if nested_ext.get("url") == "text" and "valueString" in nested_ext:
+                                ethnicity = nested_ext["valueString"]
+                                break
+                    # Alternative: look for direct ethnicity extension
+                    elif ext.get("url") == "http://hl7.org/fhir/StructureDefinition/patient-ethnicity":
+                        if "valueCodeableConcept" in ext and "text" in ext["valueCodeableConcept"]:
+                            ethnicity = ext["valueCodeableConcept"]["text"]
+                        elif "valueString" in ext:
+                            ethnicity = ext["valueString"]
+            
+            # Add to patient list with only the requested fields
+            patient_info = {
+                "id": patient_id,
+                "gender": gender,
+                "ethnicity": ethnicity,
+                "birth_date": birth_date,
+                "cohort_ids": cohort_ids
+            }
+            
+            patient_list.append(patient_info)
+        except Exception as e:
+            logger.warning("Error processing patient %s: %s", patient.get('id', 'unknown'), e)
+    
+    return patient_list
+
+
+# Building the patient summary scans every Group and Patient on HAPI. The listing pages
+# and /patient-stats share one build for a short while (concurrent callers wait for a
+# single build); uploads and cohort deletions invalidate it.
+PATIENT_LIST_TTL = 30
+patient_list_cache = {"hapi_url": None, "built_at": 0.0, "patients": None, "generation": 0}
+patient_list_state_lock = threading.Lock()
+patient_list_build_lock = threading.Lock()
+
+
+def get_patient_list(hapi_url):
+    """ Returns the demographic summary of every patient, rebuilt at most every PATIENT_LIST_TTL seconds.
+    Callers must treat the returned list as read-only; it is shared between requests.
     """
-    # Get the HAPI URL from environment variable
+    with patient_list_build_lock:
+        with patient_list_state_lock:
+            cached = patient_list_cache["patients"]
+            if (cached is not None and patient_list_cache["hapi_url"] == hapi_url
+                    and time.monotonic() - patient_list_cache["built_at"] < PATIENT_LIST_TTL):
+                return cached
+            generation = patient_list_cache["generation"]
+        
+        patients = build_patient_list(hapi_url)
+        
+        with patient_list_state_lock:
+            # Don't keep a build that an upload or deletion made stale while it ran
+            if patient_list_cache["generation"] == generation:
+                patient_list_cache.update(hapi_url=hapi_url, built_at=time.monotonic(), patients=patients)
+        return patients
+
+
+def invalidate_patient_list():
+    """ Drops the shared patient summary after patients were added or deleted. """
+    with patient_list_state_lock:
+        patient_list_cache["generation"] += 1
+        patient_list_cache["patients"] = None
+
+
+def resolve_hapi_url():
+    """ Returns the HAPI URL from the environment (or the default) and an error message if it is unreachable. """
     hapi_url = os.environ.get('HAPI_URL')
     if not hapi_url:
         hapi_url = "http://hapi:8080/fhir"
-        print(f"HAPI_URL not set, using default: {hapi_url}")
+        logger.debug("HAPI_URL not set, using default: %s", hapi_url)
     
     # Check if the HAPI server is accessible
     try:
-        r = requests.get(f"{hapi_url}/$meta", timeout=5)
-        r.raise_for_status()
+        check_hapi(hapi_url, timeout=5)
     except Exception as e:
         error_msg = f"HAPI FHIR server is not reachable: {str(e)}"
-        print(error_msg)
+        logger.error("HAPI FHIR server is not reachable: %s", e)
+        return hapi_url, error_msg
+    return hapi_url, None
+
+
+@app.get("/list-all-patients", response_class=JSONResponse)
+def list_all_patients(offset: int = Query(0, ge=0), limit: Optional[int] = Query(None, ge=1)):
+    """ Lists patients stored in the HAPI FHIR server with specific demographic information.
+    Args:
+        offset: Index of the first patient to return (default: 0).
+        limit: Maximum number of patients to return (default: all).
+    Returns:
+        A JSON object containing one page of patients with their IDs, gender, ethnicity, date of birth, and cohort IDs,
+        plus the total number of patients across all pages
+    """
+    hapi_url, error_msg = resolve_hapi_url()
+    if error_msg:
         return JSONResponse(
             status_code=500, 
             content={"error": error_msg}
         )
     
     try:
-        # Fetch all groups/cohorts
-        print("Fetching groups from HAPI server...")
-        groups = fetch_all_groups(hapi_url)
-        print(f"Found {len(groups)} groups/cohorts")
-        
-        # Create a mapping of patient IDs to cohorts
-        patient_to_cohorts = {}
-        cohort_info = []
-        
-        # Process each group/cohort
-        for group in groups:
-            try:
-                cohort_id = group.get("id")
-                cohort_name = group.get("name", cohort_id)
-                
-                # Get tags if available
-                tags = {}
-                if "meta" in group and "tag" in group["meta"]:
-                    for tag in group["meta"]["tag"]:
-                        if "system" in tag and "code" in tag:
-                            tags[tag["system"]] = tag["code"]
-                
-                # Get members
-                members = []
-                if "member" in group:
-                    for member in group["member"]:
-                        if "entity" in member and "reference" in member["entity"]:
-                            patient_ref = member["entity"]["reference"]
-                            if patient_ref.startswith("Patient/"):
-                                patient_id = patient_ref[8:]  # Remove "Patient/" prefix
-                                members.append(patient_id)
-                                
-                                # Add this cohort to the patient's list of cohorts
-                                if patient_id not in patient_to_cohorts:
-                                    patient_to_cohorts[patient_id] = []
-                                patient_to_cohorts[patient_id].append({
-                                    "cohort_id": cohort_id,
-                                    "cohort_name": cohort_name
-                                })
-                
-                # Add cohort info to the list
-                cohort_info.append({
-                    "cohort_id": cohort_id,
-                    "name": cohort_name,
-                    "member_count": len(members),
-                    "tags": tags
-                })
-            except Exception as e:
-                print(f"Error processing group {group.get('id', 'unknown')}: {str(e)}")
-        
-        # Fetch all patients to ensure we include those not in any cohort
-        print("Fetching patients from HAPI server...")
-        patients = fetch_all_patients(hapi_url)
-        print(f"Found {len(patients)} patients")
-        
-        # Create the final patient list
-        patient_list = []
-        for patient in patients:
+        patient_list = get_patient_list(hapi_url)
+        end = offset + limit if limit is not None else None
+        
+        # The list is plain JSON already; returning the response directly skips
+        # FastAPI's per-value jsonable_encoder walk over every patient
+        return JSONResponse(content={
+            "patients": patient_list[offset:end],
+            "total_patients": len(patient_list),
+            "offset": offset,
+            "limit": limit
+        })
+    except Exception as e:
+        error_msg = f"Error processing patients and cohorts: {str(e)}"
+        logger.error("Error processing patients and cohorts: %s", e)
+        return JSONResponse(
+            status_code=500, 
+            content={"error": error_msg}
+        )
+
+
+@app.get("/patient-stats", response_class=JSONResponse)
+def patient_stats():
+    """ Aggregate demographics over all patients, so clients can chart a cohort without fetching every patient.
+    Returns:
+        A JSON object with the total patient count, counts per gender and per cohort, and the average age
+    """
+    hapi_url, error_msg = resolve_hapi_url()
+    if error_msg:
+        return JSONResponse(
+            status_code=500, 
+            content={"error": error_msg}
+        )
+    
+    try:
+        patient_list = get_patient_list(hapi_url)
+        
+        gender_counts = {}
+        cohort_counts = {}
+        ages = []
+        today = datetime.now().date()
+        today_key = (today.month, today.day)
+        for patient in patient_list:
+            gender = patient["gender"]
+            gender_counts[gender] = gender_counts.get(gender, 0) + 1
+            for cohort_id in patient["cohort_ids"]:
+                cohort_counts[cohort_id] = cohort_counts.get(cohort_id, 0) + 1
             try:
-                patient_id = patient.get("id")
-                if not patient_id:
-                    continue
-                
-                # Get birth date if available
-                birth_date = patient.get("birthDate", "unknown")
-                
-                # Get cohorts from Group memberships
-                cohorts = patient_to_cohorts.get(patient_id, [])
-                cohort_ids = [c.get("cohort_id") for c in cohorts]
-                
-                # ALSO check for cohort tags in the patient's metadata
-                if "meta" in patient and "tag" in patient["meta"]:
-                    for tag in patient["meta"]["tag"]:
-                        if tag.get("system") == "urn:charm:cohort":
-                            cohort_id = tag.get("code")
-                            if cohort_id not in cohort_ids:
-                                cohort_ids.append(cohort_id)
-                
-                # Get gender if available
-                gender = patient.get("gender", "unknown")
-                
-                # Extract ethnicity from extensions
-                ethnicity = "unknown"
-                if "extension" in patient:
-                    for ext in patient["extension"]:
-                        # Look for US Core ethnicity extension
-                        if ext.get("url") == "http://hl7.org/fhir/us/core/StructureDefinition/us-core-ethnicity":
-                            # Extract text representation if available
-                            for nested_ext in ext.get("extension", []):
-                                if nested_ext.get("url") == "text" and "valueString" in nested_ext:
-                                    ethnicity = nested_ext["valueString"]
-                                    break
-                        # Alternative: look for direct ethnicity extension
-                        elif ext.get("url") == "http://hl7.org/fhir/StructureDefinition/patient-ethnicity":
-                            if "valueCodeableConcept" in ext and "text" in ext["valueCodeableConcept"]:
-                                ethnicity = ext["valueCodeableConcept"]["text"]
-                            elif "valueString" in ext:
-                                ethnicity = ext["valueString"]
-                
-                # Add to patient list with only the requested fields
-                patient_info = {
-                    "id": patient_id,
-                    "gender": gender,
-                    "ethnicity": ethnicity,
-                    "birth_date": birth_date,
-                    "cohort_ids": cohort_ids
-                }
-                
-                patient_list.append(patient_info)
-            except Exception as e:
-                print(f"Error processing patient {patient.get('id', 'unknown')}: {str(e)}")
+                # ISO dates parse on the C fast path, unlike format-driven strptime
+                birth = date.fromisoformat(patient["birth_date"])
+            except (TypeError, ValueError):
+                continue
+            ages.append(today.year - birth.year - (today_key < (birth.month, birth.day)))
         
-        return {
-            "patients": patient_list,
-            "total_patients": len(patient_list)
-        }
+        return JSONResponse(content={
+            "total_patients": len(patient_list),
+            "gender_counts": gender_counts,
+            "cohort_counts": cohort_counts,
+            "average_age": sum(ages) / len(ages) if ages else None
+        })
     except Exception as e:
-        error_msg = f"Error processing patients and cohorts: {str(e)}"
-        print(error_msg)
+        error_msg = f"Error computing patient statistics: {str(e)}"
+        logger.error("Error computing patient statistics: %s", e)
         return JSONResponse(
             status_code=500, 
             content={"error": error_msg}
@@ -1138,7 +1435,7 @@ async def list_all_patients():
 
 
 @app.get("/modules", response_class=JSONResponse)
-async def get_synthea_modules_list():
+def get_synthea_modules_list():
     try:
         # Access the shared volume path directly
         modules_path = "modules"
@@ -1270,7 +1567,7 @@ async def get_synthea_modules_list():
     
 
 @app.get("/modules/{module_name}", response_class=JSONResponse)
-async def get_module_content(module_name: str):
+def get_module_content(module_name: str):
     try:
         # Ensure module_name has .json extension
         if not module_name.endswith('.json'):
@@ -1334,7 +1631,7 @@ async def get_module_content(module_name: str):
         )
 
 @app.get("/list-all-cohorts", response_class=JSONResponse)
-async def list_all_cohorts():
+def list_all_cohorts():
     """ Lists all cohorts stored in the HAPI FHIR server along with the number of patients in each cohort and their source.
     Returns:
         A JSON object containing a list of cohorts with their IDs, patient counts, and sources.
@@ -1343,13 +1640,15 @@ async def list_all_cohorts():
     
     # Check if the HAPI server is running
     try:
-        r = requests.get(hapi_url + "/$meta")
-        r.raise_for_status()
+        check_hapi(hapi_url)
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": f"HAPI FHIR server is not reachable. (It may be starting up.)"})
     
     # Fetch all groups from the HAPI server
-    all_groups = fetch_all_groups(hapi_url)
+    try:
+        all_groups = fetch_all_groups(hapi_url)
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": f"Error fetching cohorts: {str(e)}"})
     
     # Process the groups to extract cohort information
     cohorts = []
@@ -1426,7 +1725,7 @@ def fetch_complete_patient_data(hapi_url, patient_id=None):
         if patient_id:
             url = f"{hapi_url}/Patient/{patient_id}"
             print(f"Fetching patient data from {url}")
-            r = requests.get(url)
+            r = hapi_session.get(url)
             
             # Check if patient exists
             if r.status_code == 404:
@@ -1434,7 +1733,7 @@ def fetch_complete_patient_data(hapi_url, patient_id=None):
                 return []
                 
             r.raise_for_status()
-            patients = [r.json()]
+            patients = [json.loads(r.content)]
             print(f"Successfully fetched patient {patient_id}")
         else:
             patients = fetch_all_patients(hapi_url)
@@ -1467,9 +1766,9 @@ def fetch_complete_patient_data(hapi_url, patient_id=None):
             for resource_type in resource_types:
                 try:
                     url = f"{hapi_url}/{resource_type}?patient=Patient/{patient_id}"
-                    r = requests.get(url)
+                    r = hapi_session.get(url)
                     r.raise_for_status()
-                    bundle = r.json()
+                    bundle = json.loads(r.content)
                     
                     if "entry" in bundle:
                         resources = [entry["resource"] for entry in bundle["entry"]]
@@ -1540,7 +1839,7 @@ def extract_leaf_keys(data, prefix="", result=None, value_counts=None):
 
 
 @app.get("/count-patient-keys", response_class=JSONResponse)
-async def count_patient_keys(cohort_id: str = None):
+def count_patient_keys(cohort_id: str = None):
     """ Counts the occurrence of leaf keys in patient JSON data including all related resources.
     
     Args:
@@ -1554,8 +1853,7 @@ async def count_patient_keys(cohort_id: str = None):
     
     # Check if the HAPI server is running
     try:
-        r = requests.get(hapi_url + "/$meta")
-        r.raise_for_status()
+        check_hapi(hapi_url)
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": f"HAPI FHIR server is not reachable. (It may be starting up.)"})
     
@@ -1570,9 +1868,9 @@ async def count_patient_keys(cohort_id: str = None):
             # Use _tag parameter to find patients with this cohort tag
             url = f"{hapi_url}/Patient?_tag={cohort_tag}&_count=1000"
             print(f"Querying URL: {url}")
-            r = requests.get(url)
+            r = hapi_session.get(url)
             r.raise_for_status()
-            bundle = r.json()
+            bundle = json.loads(r.content)
             
             # Extract patient IDs from the bundle
             patient_ids = []
@@ -1622,7 +1920,10 @@ async def count_patient_keys(cohort_id: str = None):
     else:
         # For all patients, we'll use a different approach to avoid memory issues
         # First get basic patient data
-        all_patients = fetch_all_patients(hapi_url)
+        try:
+            all_patients = fetch_all_patients(hapi_url)
+        except Exception as e:
+            return JSONResponse(status_code=500, content={"error": f"Error fetching patients: {str(e)}"})
         print(f"Retrieved {len(all_patients)} patients for key analysis")
         
         # Process patients in batches
@@ -1724,7 +2025,7 @@ async def count_patient_keys(cohort_id: str = None):
 
 
 @app.delete("/delete-cohort/{cohort_id}", response_class=JSONResponse)
-async def delete_cohort(cohort_id: str):
+def delete_cohort(cohort_id: str):
     """ Deletes a cohort from the HAPI FHIR server, including all patients with the cohort's tag.
     Args:
         cohort_id: The ID of the cohort to delete.
@@ -1735,8 +2036,7 @@ async def delete_cohort(cohort_id: str):
     
     # Check if the HAPI server is running
     try:
-        r = requests.get(hapi_url + "/$meta")
-        r.raise_for_status()
+        check_hapi(hapi_url)
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": f"HAPI FHIR server is not reachable. (It may be starting up.)"})
     
@@ -1760,11 +2060,11 @@ async def delete_cohort(cohort_id: str):
         
         # Get all patients with this cohort tag
         url = f"{hapi_url}/Patient?_tag={cohort_tag}&_count=5000"
-        r = requests.get(url)
+        r = hapi_session.get(url)
         r.raise_for_status()
         
         # Extract patient IDs from the search results
-        tagged_patients = r.json()
+        tagged_patients = json.loads(r.content)
         if "entry" in tagged_patients:
             for entry in tagged_patients["entry"]:
                 if "resource" in entry and entry["resource"].get("resourceType") == "Patient":
@@ -1789,7 +2089,7 @@ async def delete_cohort(cohort_id: str):
         for patient_id in patient_ids:
             try:
                 delete_url = f"{hapi_url}/Patient/{patient_id}"
-                delete_r = requests.delete(delete_url)
+                delete_r = hapi_session.delete(delete_url)
                 delete_r.raise_for_status()
                 deleted_count += 1
             except Exception as e:
@@ -1799,11 +2099,13 @@ async def delete_cohort(cohort_id: str):
     except Exception as e:
         logger.error(f"Error deleting patients: {str(e)}")
         # Continue to delete the group even if patient deletion had issues
+    finally:
+        invalidate_patient_list()
     
     # Delete the Group resource
     url = f"{hapi_url.rstrip('/')}/Group/{cohort_id}"
     try:
-        r = requests.delete(url)
+        r = hapi_session.delete(url)
         r.raise_for_status()
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": f"Error deleting cohort group: {str(e)}"})
@@ -1875,16 +2177,20 @@ async def generate_download_synthetic_patients(
             
             # Create a zip file in memory
             zip_path = os.path.join(temp_dir, "synthea_output.zip")
-            with zipfile.ZipFile(zip_path, 'w') as zf:
-                # Add all generated files to the zip
-                for root, dirs, files in os.walk(temp_dir):
-                    for file in files:
-                        if file.endswith(".csv") or file.endswith(".json") or file.endswith(".ndjson"):
-                            file_path = os.path.join(root, file)
-                            # Use relative path in the zip file
-                            arc_name = os.path.relpath(file_path, temp_dir)
-                            zf.write(file_path, arc_name)
             
+            def write_zip():
+                with zipfile.ZipFile(zip_path, 'w') as zf:
+                    # Add all generated files to the zip
+                    for root, dirs, files in os.walk(temp_dir):
+                        for file in files:
+                            if file.endswith(".csv") or file.endswith(".json") or file.endswith(".ndjson"):
+                                file_path = os.path.join(root, file)
+                                # Use relative path in the zip file
+                                arc_name = os.path.relpath(file_path, temp_dir)
+                                zf.write(file_path, arc_name)
+            
+            # Compressing the output is blocking file I/O; keep it off the event loop
+            await run_in_threadpool(write_zip)
             return zip_path
         except Exception as e:
             # Clean up the temp directory in case of error